@@ -0,0 +1,108 @@
+"""
+Achievement unlocking. Writers report the profile stats they changed as
+{field: (old, new)}; the achievements crossed come from bisecting a cached
+table sorted by condition_value (O(log A) per stat, no queries), and only
+when something was crossed is an insert queued on a small thread pool, after
+the transaction commits. The unique (user, achievement) constraint makes a
+repeated unlock a no-op.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.db import connections, transaction
+
+from core.db_router import mark_recent_write
+from .models import Achievement, UserAchievement, UserProfile
+from .progress_cache import invalidate_progress, invalidate_all_progress
+from .thresholds import crossed, threshold_table
+
+# Achievement.condition_type -> UserProfile field it measures
+ACHIEVEMENT_STATS = {
+    'message_count': 'user_message_count',
+    'voice_turns': 'voice_turn_count',
+    'session_count': 'session_count',
+    'time_spent': 'total_time_minutes',
+    'login_streak': 'streak',
+    'level': 'level',
+    'xp': 'xp',
+    'fluency_score': 'fluency_score',
+}
+
+ACHIEVEMENT_TABLE_KEY = "achievements:table"
+UNLOCK_BATCH_SIZE = 1000
+
+achievement_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="achievements")
+
+
+def run_in_background(fn, *args):
+    achievement_executor.submit(_in_worker, fn, *args)
+
+
+def _in_worker(fn, *args):
+    try:
+        fn(*args)
+    finally:
+        # Worker threads keep their own connections otherwise
+        connections.close_all()
+
+
+def achievement_table():
+    return threshold_table(ACHIEVEMENT_TABLE_KEY, Achievement.objects.values('id', 'condition_type', 'condition_value'))
+
+
+def invalidate_achievement_table():
+    cache.delete(ACHIEVEMENT_TABLE_KEY)
+
+
+def crossed_achievements(changes):
+    """Ids of the achievements the {field: (old, new)} changes reach."""
+    table = achievement_table()
+    ids = []
+    for condition_type, stat in ACHIEVEMENT_STATS.items():
+        if stat in changes:
+            old, new = changes[stat]
+            ids.extend(row['id'] for row in crossed(table, condition_type, old, new))
+    return ids
+
+
+def unlock_achievements(user_id, achievement_ids):
+    """One INSERT; rows the user already has are skipped by the unique constraint."""
+    try:
+        UserAchievement.objects.bulk_create(
+            [UserAchievement(user_id=user_id, achievement_id=pk) for pk in achievement_ids],
+            ignore_conflicts=True,
+        )
+        invalidate_progress(user_id)
+        # Their next progress read comes from the primary, which has the unlocks
+        mark_recent_write(user_id)
+    except Exception as e:
+        print(f"Error unlocking achievements: {e}")
+
+
+def schedule_unlocks(user_id, changes):
+    """Queues the unlocks for `changes`, if any, once the current transaction commits."""
+    achievement_ids = crossed_achievements(changes)
+    if achievement_ids:
+        transaction.on_commit(lambda: run_in_background(unlock_achievements, user_id, achievement_ids))
+
+
+def unlock_for_existing_users(achievement):
+    """A new (or edited) achievement, for every user whose stat already reaches it."""
+    try:
+        stat = ACHIEVEMENT_STATS.get(achievement.condition_type)
+        if stat is None:
+            return
+        user_ids = (
+            UserProfile.objects.filter(**{f'{stat}__gte': achievement.condition_value})
+            .order_by('user_id').values_list('user_id', flat=True).iterator(chunk_size=UNLOCK_BATCH_SIZE)
+        )
+        batch = []
+        for user_id in user_ids:
+            batch.append(UserAchievement(user_id=user_id, achievement=achievement))
+            if len(batch) == UNLOCK_BATCH_SIZE:
+                UserAchievement.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        UserAchievement.objects.bulk_create(batch, ignore_conflicts=True)
+        invalidate_all_progress()
+    except Exception as e:
+        print(f"Error unlocking achievement {achievement.pk}: {e}")
@@ -0,0 +1,94 @@
+import json
+import zlib
+from datetime import datetime
+
+from django.db import transaction
+from django.utils import timezone
+
+from .history_cache import invalidate_history
+from .models import ChatSession, ChatMessage, ChatSessionArchive
+
+# Preview kept on the archive row for the session list
+ARCHIVE_PREVIEW_CHARS = 255
+
+
+def archive_session(session_id):
+    """
+    Moves a session's messages into one compressed ChatSessionArchive row and
+    deletes them from the hot table. The session itself stays (title,
+    metadata, updated_at), so it keeps showing in the sidebar.
+    Returns (message_count, raw_bytes, compressed_bytes), or None if there was
+    nothing to archive.
+    """
+    with transaction.atomic():
+        session = ChatSession.objects.select_for_update().filter(id=session_id, archived_at__isnull=True).first()
+        if not session:
+            return None
+        rows = list(
+            session.messages.order_by('created_at', 'id').values_list('id', 'role', 'content', 'created_at')
+        )
+        payload = json.dumps(
+            [[pk, role, content, created_at.isoformat()] for pk, role, content, created_at in rows],
+            ensure_ascii=False,
+        ).encode()
+        data = zlib.compress(payload, 9)
+
+        ChatSessionArchive.objects.update_or_create(session=session, defaults={
+            'data': data,
+            'message_count': len(rows),
+            'last_message': rows[-1][2][:ARCHIVE_PREVIEW_CHARS] if rows else None,
+        })
+        session.messages.all().delete()
+        # update_fields without updated_at: archiving isn't activity
+        session.archived_at = timezone.now()
+        session.save(update_fields=['archived_at'])
+
+    transaction.on_commit(lambda: invalidate_history(session_id))
+    return len(rows), len(payload), len(data)
+
+
+def rehydrate_session(session):
+    """
+    Restores an archived session's messages (same ids and timestamps, so
+    cursors and summaries stay valid) and drops the archive row.
+    """
+    if session.archived_at is None:
+        return
+    with transaction.atomic():
+        locked = ChatSession.objects.select_for_update().filter(id=session.id).first()
+        # Someone else may have rehydrated it while we waited for the lock
+        if locked and locked.archived_at is not None:
+            archive = ChatSessionArchive.objects.get(session=locked)
+            rows = json.loads(zlib.decompress(archive.data))
+            ChatMessage.objects.bulk_create([
+                ChatMessage(id=pk, session_id=locked.id, role=role, content=content, created_at=datetime.fromisoformat(created_at))
+                for pk, role, content, created_at in rows
+            ], batch_size=1000)
+            archive.delete()
+            locked.archived_at = None
+            locked.save(update_fields=['archived_at'])
+
+    session.archived_at = None
+    # On commit: prepare_turn rehydrates inside its own transaction
+    transaction.on_commit(lambda: invalidate_history(session.id))
+
+
+def purge_archive(session_id, cutoff):
+    """
+    Drops the messages created before `cutoff` from a session's archive blob
+    (retention: they'd come back on rehydrate). Returns how many it dropped.
+    """
+    with transaction.atomic():
+        session = ChatSession.objects.select_for_update().filter(id=session_id).first()
+        archive = ChatSessionArchive.objects.filter(session=session).first() if session else None
+        if not archive:
+            return 0
+        rows = json.loads(zlib.decompress(archive.data))
+        kept = [row for row in rows if datetime.fromisoformat(row[3]) >= cutoff]
+        if len(kept) == len(rows):
+            return 0
+        archive.data = zlib.compress(json.dumps(kept, ensure_ascii=False).encode(), 9)
+        archive.message_count = len(kept)
+        archive.last_message = kept[-1][2][:ARCHIVE_PREVIEW_CHARS] if kept else None
+        archive.save(update_fields=['data', 'message_count', 'last_message'])
+    return len(rows) - len(kept)
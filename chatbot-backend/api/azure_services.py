@@ -1,6 +1,10 @@
 import os
 import io
+import time
+import asyncio
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,6 +12,16 @@ load_dotenv()
 AZURE_SPEECH_KEY = os.getenv("AZURE_SPEECH_KEY")
 AZURE_SPEECH_REGION = os.getenv("AZURE_SPEECH_REGION")
 
+# El SDK de Azure es bloqueante: las vistas async lo ejecutan en este pool
+# para no bloquear el event loop (I/O-bound, por eso más hilos que CPUs)
+AZURE_MAX_WORKERS = int(os.getenv("AZURE_MAX_WORKERS", "32"))
+azure_executor = ThreadPoolExecutor(max_workers=AZURE_MAX_WORKERS, thread_name_prefix="azure-speech")
+
+
+async def run_in_azure_executor(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(azure_executor, lambda: func(*args, **kwargs))
+
 
 def convert_webm_to_wav(audio_file):
     """Convierte WebM a WAV 16kHz mono"""
@@ -153,6 +167,11 @@ def pronunciation_assessment(audio_file, reference_text, language='en'):
         return None
 
 
+async def pronunciation_assessment_async(audio_file, reference_text, language='en'):
+    """pronunciation_assessment sin bloquear el event loop"""
+    return await run_in_azure_executor(pronunciation_assessment, audio_file, reference_text, language=language)
+
+
 def format_pronunciation_feedback(assessment_data):
     """Formatea datos de pronunciación para GPT"""
     if not assessment_data:
@@ -179,7 +198,141 @@ def format_pronunciation_feedback(assessment_data):
     return "\n".join(feedback_parts)
 
 
-def generate_speech(text, voice_name="en-US-JennyNeural"):
+# Formato de salida por defecto del TTS (nombre en speechsdk.SpeechSynthesisOutputFormat)
+TTS_OUTPUT_FORMAT = "Audio16Khz32KBitRateMonoMp3"
+
+# Pool de synthesizers reutilizables (AZURE_TTS_POOL=0 vuelve a crear uno por llamada)
+AZURE_TTS_POOL = os.getenv("AZURE_TTS_POOL", "1") != "0"
+AZURE_TTS_POOL_IDLE_TTL = float(os.getenv("AZURE_TTS_POOL_IDLE_TTL", "300"))
+AZURE_TTS_POOL_MAX_IDLE = int(os.getenv("AZURE_TTS_POOL_MAX_IDLE", "8"))
+
+
+def create_synthesizer(voice_name, output_format=TTS_OUTPUT_FORMAT):
+    import azure.cognitiveservices.speech as speechsdk
+
+    speech_config = speechsdk.SpeechConfig(subscription=AZURE_SPEECH_KEY, region=AZURE_SPEECH_REGION)
+    speech_config.speech_synthesis_voice_name = voice_name
+
+    # We want the audio data in memory
+    # Set output format to something standard like Mp3-128kbps or Riff-16khz
+    speech_config.set_speech_synthesis_output_format(getattr(speechsdk.SpeechSynthesisOutputFormat, output_format))
+
+    # Null audio config means "don't play to speaker, just synthesize"
+    return speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=None)
+
+
+class PooledSynthesizer:
+    """Un SpeechSynthesizer con su conexión abierta, prestado a un hilo a la vez"""
+
+    def __init__(self, key, synthesizer, connection):
+        self.key = key
+        self.synthesizer = synthesizer
+        self.connection = connection
+        self.connected = True
+        self.last_used = time.monotonic()
+        connection.disconnected.connect(self._on_disconnected)
+
+    def _on_disconnected(self, evt):
+        self.connected = False
+
+    def close(self):
+        try:
+            self.connection.close()
+        except Exception:
+            pass
+
+
+class SynthesizerPool:
+    """
+    Synthesizers "calientes" por (voice_name, output_format), compartidos por
+    todo el proceso. Crear SpeechConfig + SpeechSynthesizer y abrir el
+    websocket en cada segmento cuesta más que la síntesis de frases cortas.
+    - acquire(): reutiliza uno libre y conectado, o crea uno ya conectado
+    - release(): lo devuelve al pool, o lo descarta si falló (health check)
+    - los que pasan AZURE_TTS_POOL_IDLE_TTL sin usarse se cierran
+    """
+
+    def __init__(self, idle_ttl=AZURE_TTS_POOL_IDLE_TTL, max_idle_per_key=AZURE_TTS_POOL_MAX_IDLE):
+        self.idle_ttl = idle_ttl
+        self.max_idle_per_key = max_idle_per_key
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _create(self, key):
+        import azure.cognitiveservices.speech as speechsdk
+
+        voice_name, output_format = key
+        synthesizer = create_synthesizer(voice_name, output_format)
+        # Pre-warm: abrir la conexión ahora y no en el primer speak_text
+        connection = speechsdk.Connection.from_speech_synthesizer(synthesizer)
+        connection.open(True)
+        return PooledSynthesizer(key, synthesizer, connection)
+
+    def _evict_idle(self):
+        expired = []
+        now = time.monotonic()
+        with self._lock:
+            for key, entries in self._idle.items():
+                keep = []
+                for entry in entries:
+                    if entry.connected and now - entry.last_used < self.idle_ttl:
+                        keep.append(entry)
+                    else:
+                        expired.append(entry)
+                self._idle[key] = keep
+        for entry in expired:
+            entry.close()
+
+    def acquire(self, voice_name, output_format=TTS_OUTPUT_FORMAT):
+        key = (voice_name, output_format)
+        self._evict_idle()
+        with self._lock:
+            entries = self._idle.get(key)
+            if entries:
+                return entries.pop()
+        return self._create(key)
+
+    def release(self, entry, healthy=True):
+        if healthy and entry.connected:
+            entry.last_used = time.monotonic()
+            with self._lock:
+                entries = self._idle.setdefault(entry.key, [])
+                if len(entries) < self.max_idle_per_key:
+                    entries.append(entry)
+                    return
+        entry.close()
+
+    def prewarm(self, voice_names, output_format=TTS_OUTPUT_FORMAT, per_voice=1):
+        """Abre `per_voice` synthesizers por voz (bloqueante, usar en el executor)"""
+        entries = []
+        for voice_name in voice_names:
+            for _ in range(per_voice):
+                try:
+                    entries.append(self._create((voice_name, output_format)))
+                except Exception as e:
+                    print(f"Error pre-warming TTS voice {voice_name}: {e}")
+        for entry in entries:
+            self.release(entry)
+
+    def clear(self):
+        with self._lock:
+            entries = [e for group in self._idle.values() for e in group]
+            self._idle = {}
+        for entry in entries:
+            entry.close()
+
+
+synthesizer_pool = SynthesizerPool()
+
+
+def prewarm_synthesizers(voice_names):
+    """Pre-calienta el pool en segundo plano al arrancar el servidor"""
+    if not AZURE_SPEECH_KEY or not AZURE_SPEECH_REGION or not AZURE_TTS_POOL:
+        return None
+    return azure_executor.submit(synthesizer_pool.prewarm, sorted(set(voice_names)))
+
+
+def generate_speech(text, voice_name="en-US-JennyNeural", output_format=TTS_OUTPUT_FORMAT):
     """
     Generates speech from text using Azure Speech SDK.
     Returns the binary content of the audio file (MP3/WAV).
@@ -190,18 +343,21 @@ def generate_speech(text, voice_name="en-US-JennyNeural"):
 
     try:
         import azure.cognitiveservices.speech as speechsdk
-        
-        speech_config = speechsdk.SpeechConfig(subscription=AZURE_SPEECH_KEY, region=AZURE_SPEECH_REGION)
-        speech_config.speech_synthesis_voice_name = voice_name
-        
-        # We want the audio data in memory
-        # Set output format to something standard like Mp3-128kbps or Riff-16khz
-        speech_config.set_speech_synthesis_output_format(speechsdk.SpeechSynthesisOutputFormat.Audio16Khz32KBitRateMonoMp3)
 
-        # Null audio config means "don't play to speaker, just synthesize"
-        synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=None)
+        if AZURE_TTS_POOL:
+            entry = synthesizer_pool.acquire(voice_name, output_format)
+            synthesizer = entry.synthesizer
+        else:
+            entry = None
+            synthesizer = create_synthesizer(voice_name, output_format)
 
-        result = synthesizer.speak_text_async(text).get()
+        healthy = False
+        try:
+            result = synthesizer.speak_text_async(text).get()
+            healthy = result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted
+        finally:
+            if entry:
+                synthesizer_pool.release(entry, healthy=healthy)
 
         if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
             return result.audio_data
@@ -215,3 +371,8 @@ def generate_speech(text, voice_name="en-US-JennyNeural"):
     except Exception as e:
         print(f"Error in Azure TTS: {e}")
         return None
+
+
+async def generate_speech_async(text, voice_name="en-US-JennyNeural", output_format=TTS_OUTPUT_FORMAT):
+    """generate_speech sin bloquear el event loop"""
+    return await run_in_azure_executor(generate_speech, text, voice_name=voice_name, output_format=output_format)
@@ -0,0 +1,137 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from .history_cache import load_history
+from .models import ChatSession, ChatMessage
+from .openai_services import summarize_conversation_async
+
+try:
+    import tiktoken
+except ImportError:  # Optional: without it tokens are estimated as chars / 4
+    tiktoken = None
+
+_encoding = None
+
+
+def load_encoding():
+    """The o200k_base encoding, loaded once per process (False without tiktoken)."""
+    global _encoding
+    if _encoding is None:
+        _encoding = False
+        if tiktoken is not None:
+            try:
+                _encoding = tiktoken.get_encoding("o200k_base")
+            except Exception as e:  # e.g. no network to download the BPE file
+                print(f"tiktoken unavailable, estimating tokens: {e}")
+    return _encoding
+
+
+def count_tokens(text):
+    """Tokens of `text` for gpt-4o-mini (o200k_base), or an estimate without tiktoken."""
+    encoding = load_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def message_tokens(message):
+    # ~4 tokens of per-message overhead (role, separators) in the chat format
+    return count_tokens(message["content"]) + 4
+
+
+def build_context(chat_session, system_prompt):
+    """
+    Messages for the next completion: system prompt, rolling summary of older
+    turns (metadata['summary']) and as many recent messages as fit in
+    CHAT_CONTEXT_MAX_TOKENS, out of the latest CHAT_CONTEXT_MAX_MESSAGES
+    (api/history_cache.py, no DB query once the session is cached).
+
+    Returns (messages, summarize_before_id): the id of the oldest message in the
+    window when older messages aren't covered by the summary yet, else None.
+    """
+    summary = chat_session.metadata.get('summary')
+    summary_upto = chat_session.metadata.get('summary_upto', 0)
+
+    # Newest first; the cached history holds one row past the cap
+    recent = [m for m in reversed(load_history(chat_session.id)) if m['id'] > summary_upto]
+    truncated = len(recent) > settings.CHAT_CONTEXT_MAX_MESSAGES
+    recent = recent[:settings.CHAT_CONTEXT_MAX_MESSAGES]
+
+    messages = [{"role": "system", "content": system_prompt}]
+    if summary:
+        messages.append({"role": "system", "content": f"--- SUMMARY OF EARLIER CONVERSATION ---\n{summary}"})
+    budget = settings.CHAT_CONTEXT_MAX_TOKENS - sum(message_tokens(m) for m in messages)
+
+    window = []
+    for msg in recent:
+        cost = message_tokens(msg)
+        # The newest message (the user's turn) always goes in
+        if window and cost > budget:
+            break
+        window.append(msg)
+        budget -= cost
+    window.reverse()
+
+    messages.extend({"role": m["role"], "content": m["content"]} for m in window)
+
+    summarize_before_id = None
+    if window and (truncated or len(window) < len(recent)):
+        summarize_before_id = window[0]["id"]
+    return messages, summarize_before_id
+
+
+def store_summary(session_id, summary, summary_upto):
+    # Re-read under a row lock so keys written meanwhile (persona, feedback) survive
+    with transaction.atomic():
+        chat_session = ChatSession.objects.select_for_update().filter(id=session_id).first()
+        if not chat_session or chat_session.metadata.get('summary_upto', 0) >= summary_upto:
+            return
+        chat_session.metadata['summary'] = summary
+        chat_session.metadata['summary_upto'] = summary_upto
+        chat_session.save(update_fields=['metadata'])
+
+
+def pending_summary_messages(session_id, after_id, before_id):
+    return list(
+        ChatMessage.objects.filter(session_id=session_id, id__gt=after_id, id__lt=before_id)
+        .order_by('created_at', 'id')
+        .values('id', 'role', 'content')[:settings.CHAT_SUMMARY_BATCH_MESSAGES]
+    )
+
+
+_refreshing = set()
+_background_tasks = set()
+
+
+async def refresh_summary(session_id, previous_summary, summary_upto, before_id):
+    """Folds the messages between the summary and the context window into the summary."""
+    try:
+        pending = await sync_to_async(pending_summary_messages)(session_id, summary_upto, before_id)
+        if not pending:
+            return
+        summary = await summarize_conversation_async(previous_summary, pending)
+        if summary:
+            await sync_to_async(store_summary)(session_id, summary, pending[-1]['id'])
+    except Exception as e:
+        print(f"Error refreshing conversation summary: {e}")
+    finally:
+        _refreshing.discard(session_id)
+
+
+def schedule_summary_refresh(chat_session, before_id):
+    """Starts refresh_summary off the request path (at most one per session at a time)."""
+    if chat_session.id in _refreshing:
+        return
+    _refreshing.add(chat_session.id)
+    task = asyncio.get_running_loop().create_task(refresh_summary(
+        chat_session.id,
+        chat_session.metadata.get('summary'),
+        chat_session.metadata.get('summary_upto', 0),
+        before_id,
+    ))
+    # Keep a reference until it finishes (the loop only holds weak ones)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
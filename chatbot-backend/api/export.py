@@ -0,0 +1,102 @@
+import json
+import zlib
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import ChatSession, ChatMessage, ChatSessionArchive
+
+EXPORT_CHUNK_SIZE = 2000
+# Bytes buffered before a chunk is yielded to the response/file
+FLUSH_BYTES = 64 * 1024
+
+
+def export_records(user, using='default'):
+    """
+    The user's sessions, each followed by its messages, as dicts (type
+    'session' / 'message'). Sessions and messages are two ordered server-side
+    iterators merged on session id, so memory stays flat however long the
+    history is. Archived sessions are read from their archive blob.
+    """
+    sessions = (
+        ChatSession.objects.using(using).filter(user=user).order_by('id')
+        .values('id', 'title', 'created_at', 'updated_at', 'archived_at')
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    messages = (
+        ChatMessage.objects.using(using).filter(session__user=user).order_by('session_id', 'created_at', 'id')
+        .values('id', 'session_id', 'role', 'content', 'created_at')
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    message = next(messages, None)
+
+    for session in sessions:
+        yield {'type': 'session', **session}
+
+        # Messages of sessions deleted since the session iterator started
+        while message and message['session_id'] < session['id']:
+            message = next(messages, None)
+        while message and message['session_id'] == session['id']:
+            yield {'type': 'message', **message}
+            message = next(messages, None)
+
+        if session['archived_at']:
+            archive = ChatSessionArchive.objects.using(using).filter(session_id=session['id']).first()
+            if archive:
+                for pk, role, content, created_at in json.loads(zlib.decompress(archive.data)):
+                    yield {'type': 'message', 'id': pk, 'session_id': session['id'], 'role': role,
+                           'content': content, 'created_at': datetime.fromisoformat(created_at)}
+
+
+def encode_export(records, fmt='ndjson', compress=False):
+    """
+    Serializes export_records() as NDJSON (one object per line) or a JSON
+    array, optionally gzip-compressed, in chunks of about FLUSH_BYTES.
+    """
+    gzip = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    buffer = []
+    size = 0
+
+    def emit(text):
+        data = text.encode()
+        return gzip.compress(data) if gzip else data
+
+    if fmt == 'json':
+        buffer.append("[\n")
+    for i, record in enumerate(records):
+        line = json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False)
+        if fmt == 'json':
+            line = ("" if i == 0 else ",\n") + line
+        else:
+            line += "\n"
+        buffer.append(line)
+        size += len(line)
+        if size >= FLUSH_BYTES:
+            chunk = emit("".join(buffer))
+            buffer, size = [], 0
+            if chunk:
+                yield chunk
+    if fmt == 'json':
+        buffer.append("\n]\n")
+
+    chunk = emit("".join(buffer))
+    if gzip:
+        chunk += gzip.flush()
+    if chunk:
+        yield chunk
+
+
+async def async_chunks(chunks):
+    """
+    `chunks` as an async iterator, one chunk per call into the sync thread.
+    Under ASGI Django reads a sync iterator with sync_to_async(list), i.e. the
+    whole export in memory before the first byte goes out.
+    """
+    end = object()
+    try:
+        # thread_sensitive: the server-side cursors stay on the thread that opened them
+        while (chunk := await sync_to_async(next, thread_sensitive=True)(chunks, end)) is not end:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close, thread_sensitive=True)()
@@ -0,0 +1,129 @@
+"""
+Every UserProfile progress write goes through here. The profile row is locked
+(select_for_update) for the rest of the transaction, the new values are
+computed from what was read and only those fields are saved, so concurrent
+turns of the same user (two tabs, retries) queue up instead of overwriting
+each other. Inside a turn's transaction the writes run in a savepoint, so a
+failure here rolls back only the progress update. Level and streak come from
+the updated values, and the before/after stats drive missions, achievements
+and the progress cache.
+"""
+import datetime
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .achievements import schedule_unlocks
+from .missions import MESSAGE_SENT, TIME_ADDED, STREAK_CHANGED, dispatch
+from .models import UserProfile
+from .progress_cache import invalidate_progress
+
+XP_PER_LEVEL = 100
+# Stats reported to the mission and achievement engines
+PROGRESS_STATS = (
+    'xp', 'total_time_minutes', 'streak', 'level', 'user_message_count', 'session_count', 'voice_turn_count',
+)
+
+
+def level_for_xp(xp):
+    # Simple: 100 XP per level
+    return 1 + xp // XP_PER_LEVEL
+
+
+def xp_award(xp):
+    """update() kwargs adding XP in SQL, with the level it reaches (for set-based awards)."""
+    return {'xp': F('xp') + xp, 'level': Greatest('level', 1 + (F('xp') + xp) / XP_PER_LEVEL)}
+
+
+def next_streak(streak, last_activity, now):
+    if not last_activity:
+        return 1
+    last_date = last_activity.date()
+    today = now.date()
+    if last_date == today - datetime.timedelta(days=1):
+        return streak + 1
+    if last_date < today - datetime.timedelta(days=1):
+        return 1  # Reset streak if missed a day
+    # Already active today (a profile created today starts at 0)
+    return max(streak, 1)
+
+
+def take_write_lock(user):
+    """
+    First statement of a transaction that writes progress. SQLite ignores FOR
+    UPDATE, and a transaction that reads before it writes can't wait for the
+    write lock (it fails with "database is locked"); a no-op UPDATE takes the
+    lock up front, so concurrent callers queue for OPTIONS['timeout'] instead.
+    """
+    if connection.vendor == 'sqlite':
+        UserProfile.objects.filter(user=user).update(xp=F('xp'))
+
+
+def locked_profile(user):
+    profile = UserProfile.objects.select_for_update().filter(user=user).first()
+    if profile is None:
+        UserProfile.objects.get_or_create(user=user)
+        profile = UserProfile.objects.select_for_update().get(user=user)
+    return profile
+
+
+def record_activity(user, xp=0, minutes=0.0, counters=()):
+    """
+    Adds XP and minutes, one to each of `counters` (UserProfile fields), and
+    moves the streak, level and last_activity on; missions crossed add their
+    XP to the same UPDATE. Returns the updated profile.
+    """
+    opens_transaction = not connection.in_atomic_block
+    with transaction.atomic():
+        if opens_transaction:
+            # Inside a turn's transaction the caller took it already
+            take_write_lock(user)
+        profile = locked_profile(user)
+        before = {stat: getattr(profile, stat) for stat in PROGRESS_STATS}
+
+        profile.xp += xp
+        profile.total_time_minutes += minutes
+        for counter in counters:
+            setattr(profile, counter, getattr(profile, counter) + 1)
+        profile.streak = next_streak(profile.streak, profile.last_activity, timezone.now())
+
+        profile.xp += (
+            dispatch(user, MESSAGE_SENT, before['user_message_count'], profile.user_message_count)
+            + dispatch(user, TIME_ADDED, before['total_time_minutes'], profile.total_time_minutes)
+            + dispatch(user, STREAK_CHANGED, before['streak'], profile.streak)
+        )
+        profile.level = max(profile.level, level_for_xp(profile.xp))
+        # last_activity is auto_now
+        profile.save(update_fields=['xp', 'total_time_minutes', 'streak', 'level', 'last_activity', *counters])
+
+        schedule_unlocks(user.id, {
+            stat: (before[stat], getattr(profile, stat))
+            for stat in PROGRESS_STATS if getattr(profile, stat) != before[stat]
+        })
+        invalidate_progress(user.id)
+    return profile
+
+
+def record_fluency(user, score):
+    """Folds a pronunciation fluency score into the profile's running score."""
+    opens_transaction = not connection.in_atomic_block
+    with transaction.atomic():
+        if opens_transaction:
+            take_write_lock(user)
+        profile = locked_profile(user)
+        previous_score = profile.fluency_score
+
+        if profile.fluency_score == 0:
+            # First time: Set directly
+            profile.fluency_score = int(score)
+        else:
+            # Moving Average: 70% History, 30% New
+            # This prevents drastic jumps (e.g. from 100 to 26 in one go) and smooths progress
+            profile.fluency_score = int((float(profile.fluency_score) * 0.7) + (score * 0.3))
+
+        profile.save(update_fields=['fluency_score'])
+        schedule_unlocks(user.id, {'fluency_score': (previous_score, profile.fluency_score)})
+        invalidate_progress(user.id)
+    return profile
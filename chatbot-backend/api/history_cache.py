@@ -0,0 +1,77 @@
+"""
+Cached recent history per chat session, appended to as messages commit.
+Correct context needs one cache for every process: a single worker, or
+REDIS_URL (LocMem is per process, so each worker would keep its own copy).
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# A crashed append only holds the session's lock this long (seconds)
+APPEND_LOCK_TIMEOUT = 5
+# How long an append waits for the lock before dropping the entry instead
+APPEND_LOCK_WAIT = 1
+
+
+def history_key(session_id):
+    return f"chat_history:{session_id}"
+
+
+def history_limit():
+    # One row past the context cap so build_context can tell older ones exist
+    return settings.CHAT_CONTEXT_MAX_MESSAGES + 1
+
+
+def load_history(session_id):
+    """
+    Newest history_limit() messages of a session as [{id, role, content}],
+    oldest first. Served from the cache; only a miss queries the DB.
+    """
+    history = cache.get(history_key(session_id))
+    if history is None:
+        from .models import ChatMessage
+
+        history = list(
+            ChatMessage.objects.filter(session_id=session_id)
+            .order_by('-created_at', '-id')
+            .values('id', 'role', 'content')[:history_limit()]
+        )
+        history.reverse()
+        cache.set(history_key(session_id), history, settings.CHAT_HISTORY_CACHE_TTL)
+    return history
+
+
+def append_message(message):
+    """
+    Adds a new ChatMessage to its session's cached history, if it's cached.
+    Appends to one session take turns on a lock key (cache.add is atomic);
+    when one can't go in order, the entry is dropped instead and the next
+    load_history rebuilds it from the DB.
+    """
+    key = history_key(message.session_id)
+    lock_key = f"{key}:lock"
+    deadline = time.monotonic() + APPEND_LOCK_WAIT
+    while not cache.add(lock_key, True, APPEND_LOCK_TIMEOUT):
+        if time.monotonic() > deadline:
+            cache.delete(key)
+            return
+        time.sleep(0.01)
+    try:
+        history = cache.get(key)
+        if history is None:
+            return  # The next load_history reads it from the DB
+        if history and history[-1]['id'] >= message.id:
+            # Already there if a miss loaded it right after the insert; otherwise a
+            # newer row committed first and appending would put it out of order
+            if not any(m['id'] == message.id for m in history):
+                cache.delete(key)
+            return
+        history.append({'id': message.id, 'role': message.role, 'content': message.content})
+        cache.set(key, history[-history_limit():], settings.CHAT_HISTORY_CACHE_TTL)
+    finally:
+        cache.delete(lock_key)
+
+
+def invalidate_history(session_id):
+    cache.delete(history_key(session_id))
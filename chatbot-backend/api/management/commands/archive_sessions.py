@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.archive import archive_session
+from api.models import ChatSession
+
+
+class Command(BaseCommand):
+    help = (
+        "Compress the messages of sessions idle for more than CHAT_ARCHIVE_AFTER_DAYS into "
+        "ChatSessionArchive. They stay in the session list and come back when opened."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.CHAT_ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--limit', type=int, default=None, help="Archive at most this many sessions")
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        candidates = (
+            ChatSession.objects.filter(updated_at__lt=cutoff, archived_at__isnull=True)
+            .order_by('updated_at')
+            .values_list('id', flat=True)
+        )
+        if options['limit']:
+            candidates = candidates[:options['limit']]
+        session_ids = list(candidates)
+
+        if options['dry_run']:
+            self.stdout.write(f"{len(session_ids)} sessions idle since before {cutoff:%Y-%m-%d} would be archived")
+            return
+
+        archived = messages = raw_bytes = compressed_bytes = 0
+        # One short transaction per session (api.archive.archive_session)
+        for session_id in session_ids:
+            result = archive_session(session_id)
+            if result:
+                archived += 1
+                messages += result[0]
+                raw_bytes += result[1]
+                compressed_bytes += result[2]
+
+        ratio = f" ({compressed_bytes / raw_bytes:.0%} of {raw_bytes / 1024:.0f}KiB)" if raw_bytes else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {archived} sessions, {messages} messages{ratio}"
+        ))
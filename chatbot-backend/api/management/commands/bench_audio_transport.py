@@ -0,0 +1,81 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, override_settings
+
+# ~32 kbps MP3 at ~15 chars/s of speech
+MP3_BYTES_PER_CHAR = 270
+
+REPLY = (
+    "Great question! The past tense of 'go' is 'went', not 'goed'. "
+    "For example, you can say: 'Yesterday I went to the park with my friends.' "
+    "Irregular verbs like this one are very common in everyday English. "
+    "Try to write three sentences about your last weekend using 'went'. "
+    "I will check them and give you feedback on each one."
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Bytes on the wire and server CPU per chat turn: segment audio as base64 "
+        "inside the SSE events vs. raw MP3 fetched from /api/tts/<id>/."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--turns', type=int, default=50)
+
+    def handle(self, *args, **options):
+        async def fake_chat_response(messages):
+            async def gen():
+                for word in REPLY.split(" "):
+                    yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word + " "))])
+            return gen()
+
+        def fake_tts(text, voice_name=None, **kwargs):
+            return os.urandom(len(text) * MP3_BYTES_PER_CHAR)
+
+        with tempfile.TemporaryDirectory() as cache_dir, \
+                override_settings(ALLOWED_HOSTS=['*']), \
+                mock.patch('api.views_openai.get_chat_response_async', fake_chat_response), \
+                mock.patch('api.azure_services.generate_speech', fake_tts), \
+                mock.patch('api.tts_cache.tts_cache.disk_dir', cache_dir):
+            for transport in ('base64', 'binary'):
+                sse_bytes, audio_bytes, cpu = asyncio.run(self.run_turns(transport, options['turns']))
+                turns = options['turns']
+                self.stdout.write(
+                    f"{transport:<7} per turn: sse={sse_bytes / turns / 1024:.1f}KiB "
+                    f"audio={audio_bytes / turns / 1024:.1f}KiB "
+                    f"total={(sse_bytes + audio_bytes) / turns / 1024:.1f}KiB "
+                    f"server cpu={cpu / turns * 1000:.2f}ms"
+                )
+
+    async def run_turns(self, transport, turns):
+        client = AsyncClient()
+        sse_bytes = audio_bytes = 0
+        # Warm up so the first synthesis doesn't count
+        await self.turn(client, transport)
+        cpu_start = time.process_time()
+        for _ in range(turns):
+            sse, audio = await self.turn(client, transport)
+            sse_bytes += sse
+            audio_bytes += audio
+        return sse_bytes, audio_bytes, time.process_time() - cpu_start
+
+    async def turn(self, client, transport):
+        response = await client.post('/api/chat/', {'message': 'What is the past of go?', 'audio_transport': transport})
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        audio_bytes = 0
+        for event in body.decode().split("\n\n"):
+            if not event.startswith("data: {"):
+                continue
+            payload = json.loads(event[len("data: "):])
+            if payload.get('audio_id'):
+                audio = await client.get(f"/api/tts/{payload['audio_id']}/")
+                audio_bytes += len(audio.content)
+        return len(body), audio_bytes
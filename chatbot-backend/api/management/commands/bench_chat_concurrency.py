@@ -0,0 +1,197 @@
+import asyncio
+import io
+import json
+import statistics
+import sys
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.http import StreamingHttpResponse
+from django.test.utils import override_settings
+from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
+
+from api import azure_services, openai_services
+from api.segmenter import SentenceSegmenter, clean_text_for_speech
+from api.views_openai import finish_turn, get_request_data, prepare_turn, response_segment_event
+
+
+def fake_chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+@csrf_exempt
+def sync_chat_view(request):
+    """
+    Baseline: the chat endpoint as it was before the async view (a text turn).
+    The worker blocks on every LLM token and on each segment's TTS call in turn.
+    """
+    data = get_request_data(request)
+    user_message = data.get('message')
+    chat_session, messages, voice_name, _ = prepare_turn(AnonymousUser(), data, user_message, None)
+
+    def event_stream():
+        full_response_text = ""
+        segmenter = SentenceSegmenter()
+        speech_buffer = accumulated_raw_text = ""
+        for chunk in openai_services.get_chat_response(messages, stream=True):
+            content = chunk.choices[0].delta.content
+            full_response_text += content
+            for sentence in segmenter.feed(content):
+                accumulated_raw_text += sentence
+                speech_buffer += " " + clean_text_for_speech(sentence)
+                if len(speech_buffer) > 50:
+                    audio_content = azure_services.generate_speech(speech_buffer.strip(), voice_name=voice_name)
+                    yield response_segment_event(accumulated_raw_text, audio_content)
+                    speech_buffer = accumulated_raw_text = ""
+        accumulated_raw_text += segmenter.flush()
+        if accumulated_raw_text.strip():
+            audio_content = azure_services.generate_speech(clean_text_for_speech(accumulated_raw_text), voice_name=voice_name)
+            yield response_segment_event(accumulated_raw_text, audio_content)
+        finish_turn(AnonymousUser(), chat_session, full_response_text, None)
+        yield "data: [DONE]\n\n"
+
+    return StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+
+
+# ROOT_URLCONF for the WSGI run
+urlpatterns = [path('api/chat/', sync_chat_view)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load benchmark for /api/chat/: N concurrent SSE conversations served by the "
+        "async view under ASGI (one event loop) vs the previous sync view under WSGI (a "
+        "fixed number of sync workers, like gunicorn). OpenAI and Azure are replaced by "
+        "fakes with configurable latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--streams', type=int, default=200, help='Concurrent conversations')
+        parser.add_argument('--workers', type=int, default=4, help='WSGI workers (gunicorn -w)')
+        parser.add_argument('--tokens', type=int, default=60, help='LLM tokens per reply')
+        parser.add_argument('--token-delay', type=float, default=0.02, help='Seconds between LLM tokens')
+        parser.add_argument('--tts-delay', type=float, default=0.3, help='Seconds per TTS call')
+        parser.add_argument('--mode', choices=['asgi', 'wsgi', 'both'], default='both')
+
+    def handle(self, *args, **options):
+        self.options = options
+        words = "This is a sentence that the tutor says. " * (options['tokens'] // 8 + 1)
+        self.tokens = [w + " " for w in words.split()][:options['tokens']]
+        self.body = json.dumps({"message": "Hello, how are you?"}).encode()
+
+        async def fake_chat_response(messages):
+            async def gen():
+                for token in self.tokens:
+                    await asyncio.sleep(options['token_delay'])
+                    yield fake_chunk(token)
+            return gen()
+
+        def fake_sync_chat_response(messages, stream=False):
+            for token in self.tokens:
+                time.sleep(options['token_delay'])
+                yield fake_chunk(token)
+
+        def fake_tts(text, voice_name=None, **kwargs):
+            time.sleep(options['tts_delay'])
+            return b"\x00" * 4000
+
+        warnings.simplefilter('ignore')
+        # Every fake reply is identical: keep the TTS cache out of the measurement
+        with mock.patch('api.views_openai.get_chat_response_async', fake_chat_response), \
+                mock.patch('api.openai_services.get_chat_response', fake_sync_chat_response), \
+                mock.patch('api.azure_services.generate_speech', fake_tts), \
+                mock.patch('api.tts_cache.tts_cache.enabled', False):
+            if options['mode'] in ('asgi', 'both'):
+                self.report('ASGI (async view)', *self.run_asgi())
+            if options['mode'] in ('wsgi', 'both'):
+                self.report(f"WSGI (sync, {options['workers']} workers)", *self.run_wsgi())
+
+    def report(self, label, elapsed, ttfbs, totals):
+        n = len(totals)
+        self.stdout.write(
+            f"{label:<26} streams={n} wall={elapsed:.2f}s "
+            f"throughput={n / elapsed:.1f} streams/s "
+            f"ttfb p50={statistics.median(ttfbs):.3f}s p95={self.p95(ttfbs):.3f}s "
+            f"total p50={statistics.median(totals):.3f}s p95={self.p95(totals):.3f}s"
+        )
+
+    @staticmethod
+    def p95(values):
+        values = sorted(values)
+        return values[min(len(values) - 1, int(len(values) * 0.95))]
+
+    def run_asgi(self):
+        from core.asgi import application
+
+        async def one():
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+                'method': 'POST', 'scheme': 'http', 'path': '/api/chat/', 'raw_path': b'/api/chat/',
+                'query_string': b'', 'root_path': '',
+                'headers': [(b'host', b'localhost'), (b'content-type', b'application/json'),
+                            (b'content-length', str(len(self.body)).encode())],
+                'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+            }
+            finished = asyncio.Event()
+            body_sent = False
+            start = time.perf_counter()
+            ttfb = None
+
+            async def receive():
+                nonlocal body_sent
+                if not body_sent:
+                    body_sent = True
+                    return {'type': 'http.request', 'body': self.body, 'more_body': False}
+                await finished.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                nonlocal ttfb
+                if message['type'] == 'http.response.body' and message.get('body') and ttfb is None:
+                    ttfb = time.perf_counter() - start
+
+            await application(scope, receive, send)
+            finished.set()
+            return ttfb, time.perf_counter() - start
+
+        async def run_all():
+            start = time.perf_counter()
+            results = await asyncio.gather(*[one() for _ in range(self.options['streams'])])
+            return time.perf_counter() - start, results
+
+        elapsed, results = asyncio.run(run_all())
+        return elapsed, [r[0] for r in results], [r[1] for r in results]
+
+    @override_settings(ROOT_URLCONF=__name__)
+    def run_wsgi(self):
+        from core.wsgi import application
+
+        def one(submitted_at):
+            environ = {
+                'REQUEST_METHOD': 'POST', 'PATH_INFO': '/api/chat/', 'SCRIPT_NAME': '', 'QUERY_STRING': '',
+                'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+                'CONTENT_TYPE': 'application/json', 'CONTENT_LENGTH': str(len(self.body)),
+                'wsgi.input': io.BytesIO(self.body), 'wsgi.url_scheme': 'http', 'wsgi.errors': sys.stderr,
+            }
+            ttfb = None
+            result = application(environ, lambda status, headers, exc_info=None: None)
+            try:
+                for chunk in result:
+                    if chunk and ttfb is None:
+                        ttfb = time.perf_counter() - submitted_at
+            finally:
+                result.close()
+            return ttfb, time.perf_counter() - submitted_at
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.options['workers']) as pool:
+            futures = [pool.submit(one, time.perf_counter()) for _ in range(self.options['streams'])]
+            results = [f.result() for f in futures]
+        elapsed = time.perf_counter() - start
+        return elapsed, [r[0] for r in results], [r[1] for r in results]
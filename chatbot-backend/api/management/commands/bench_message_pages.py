@@ -0,0 +1,79 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.models import ChatSession, ChatMessage
+from api.pagination import MessageKeysetPagination
+
+BENCH_USERNAME = "bench_message_pages"
+
+
+class Command(BaseCommand):
+    help = (
+        "Time message history pages on one long session: keyset cursors (before=) vs. "
+        "LIMIT/OFFSET at the same depth. Creates a throwaway user and session in the "
+        "configured database and deletes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=100_000)
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--keep', action='store_true', help="Keep the session for the next run")
+
+    def handle(self, *args, **options):
+        total = options['messages']
+        page_size = options['page_size']
+
+        user, _ = User.objects.get_or_create(username=BENCH_USERNAME)
+        session = ChatSession.objects.filter(user=user).first()
+        if not session or session.messages.count() != total:
+            ChatSession.objects.filter(user=user).delete()
+            session = ChatSession.objects.create(user=user, title="Benchmark")
+            self.stdout.write(f"Creating {total} messages...")
+            for start in range(0, total, 5000):
+                ChatMessage.objects.bulk_create([
+                    ChatMessage(session=session, role='user' if i % 2 == 0 else 'assistant', content=f"Message {i} " + "lorem ipsum " * 10)
+                    for i in range(start, min(start + 5000, total))
+                ])
+
+        try:
+            with override_settings(ALLOWED_HOSTS=['*']):
+                self.time_pages(session, total, page_size, options['repeat'])
+        finally:
+            if not options['keep']:
+                user.delete()
+
+    def time_pages(self, session, total, page_size, repeat):
+        factory = APIRequestFactory()
+        ordered = ChatMessage.objects.filter(session=session).order_by('created_at', 'id')
+        cursor = MessageKeysetPagination()
+
+        for depth in (0, total // 100, total // 2, total - page_size):
+            # The message right after the page, counted from the newest one
+            anchor = ordered.reverse()[depth - 1:depth].get() if depth else None
+            params = {'page_size': page_size}
+            if anchor:
+                params['before'] = cursor.encode_cursor(anchor)
+
+            request = Request(factory.get(f'/api/sessions/{session.id}/messages/', params))
+
+            def keyset_page():
+                page = MessageKeysetPagination().paginate_queryset(session.messages.all(), request)
+                assert len(page) == page_size
+                return page
+
+            def offset_page():
+                return list(ordered.reverse()[depth:depth + page_size])
+
+            for name, func in (('keyset', keyset_page), ('offset', offset_page)):
+                func()  # warm up
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    func()
+                elapsed = (time.perf_counter() - start) / repeat
+                self.stdout.write(f"depth {depth:>7} {name:<6} {elapsed * 1000:8.2f}ms/page")
@@ -0,0 +1,71 @@
+import re
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.segmenter import SentenceSegmenter
+
+PARAGRAPH = (
+    "Great question! The past tense of 'go' is 'went', not 'goed'. "
+    "Mr. Smith paid 3.5 dollars at 9 a.m. for the book (El Sr. Smith pagó 3.5 dólares. Muy bien). "
+    "Try to write three sentences about your last weekend, e.g. a trip or a meal. "
+)
+# Lists, code and run-on answers: the pending buffer keeps growing between boundaries
+RUN_ON = "first you say hello and then you ask how they are and then you listen, "
+
+
+def regex_rescan(deltas):
+    """Previous loop in ChatView: re.search over the whole pending buffer on every delta."""
+    buffer = ""
+    sentences = []
+    for content in deltas:
+        buffer += content
+        while True:
+            match = re.search(r'[.!?]\s', buffer)
+            if not match:
+                break
+            sentences.append(buffer[:match.end()])
+            buffer = buffer[match.end():]
+    if buffer.strip():
+        sentences.append(buffer)
+    return sentences
+
+
+def incremental(deltas):
+    segmenter = SentenceSegmenter()
+    sentences = []
+    for content in deltas:
+        sentences.extend(segmenter.feed(content))
+    remaining = segmenter.flush()
+    if remaining.strip():
+        sentences.append(remaining)
+    return sentences
+
+
+class Command(BaseCommand):
+    help = "Time the streaming sentence segmenter against the old regex re-scan loop on replies of growing size."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delta-size', type=int, default=4, help="Characters per streamed delta")
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        size = options['delta_size']
+        workloads = [
+            (label, length, (source * (length // len(source) + 1))[:length])
+            for label, source in (('prose', PARAGRAPH), ('run-on', RUN_ON))
+            for length in (1_000, 10_000, 100_000)
+        ]
+        for label, length, text in workloads:
+            deltas = [text[i:i + size] for i in range(0, len(text), size)]
+
+            for name, func in (('regex', regex_rescan), ('segmenter', incremental)):
+                best = float('inf')
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    sentences = func(deltas)
+                    best = min(best, time.perf_counter() - start)
+                self.stdout.write(
+                    f"{label:<6} {length:>7} chars {name:<9} {best * 1000:9.2f}ms "
+                    f"({best / len(deltas) * 1e6:.2f}us/delta, {len(sentences)} sentences)"
+                )
@@ -0,0 +1,45 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import azure_services
+
+
+class Command(BaseCommand):
+    help = (
+        "Per-segment Azure TTS latency with and without the synthesizer pool. "
+        "Needs AZURE_SPEECH_KEY / AZURE_SPEECH_REGION."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--segments', type=int, default=20)
+        parser.add_argument('--voice', default='en-US-AvaMultilingualNeural')
+        parser.add_argument('--text', default="Great job! Let's practice a few more sentences together.")
+
+    def handle(self, *args, **options):
+        if not azure_services.AZURE_SPEECH_KEY or not azure_services.AZURE_SPEECH_REGION:
+            raise CommandError("Azure Speech is not configured (AZURE_SPEECH_KEY / AZURE_SPEECH_REGION)")
+
+        for pooled in (False, True):
+            azure_services.AZURE_TTS_POOL = pooled
+            azure_services.synthesizer_pool.clear()
+            latencies = []
+            for i in range(options['segments']):
+                # Distinct text per segment so nothing upstream can cache it
+                text = f"{options['text']} Number {i}."
+                start = time.perf_counter()
+                audio = azure_services.generate_speech(text, voice_name=options['voice'])
+                latencies.append(time.perf_counter() - start)
+                if not audio:
+                    raise CommandError("Synthesis failed, see output above")
+
+            latencies_ms = sorted(l * 1000 for l in latencies)
+            self.stdout.write(
+                f"{'pool' if pooled else 'no pool':<8} segments={len(latencies_ms)} "
+                f"first={latencies[0] * 1000:.0f}ms "
+                f"p50={statistics.median(latencies_ms):.0f}ms "
+                f"p95={latencies_ms[min(len(latencies_ms) - 1, int(len(latencies_ms) * 0.95))]:.0f}ms "
+                f"mean={statistics.mean(latencies_ms):.0f}ms"
+            )
+        azure_services.synthesizer_pool.clear()
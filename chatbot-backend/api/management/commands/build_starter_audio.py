@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from api import azure_services
+from api.starter_audio import build_bundle
+
+
+class Command(BaseCommand):
+    help = "Renders the starter replies for every persona voice into the starter audio bundle (run on deploy)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Re-render even if this version exists')
+
+    def handle(self, *args, **options):
+        if not azure_services.AZURE_SPEECH_KEY or not azure_services.AZURE_SPEECH_REGION:
+            # No fallo del build: ChatView sintetiza los starters en vivo si no hay bundle
+            self.stdout.write(self.style.WARNING("Azure Speech not configured, skipping starter audio bundle"))
+            return
+
+        def synthesize(text, voice_name):
+            return azure_services.generate_speech(text, voice_name=voice_name)
+
+        version, rendered, failed = build_bundle(synthesize, stdout=self.stdout, force=options['force'])
+        if rendered or failed:
+            style = self.style.WARNING if failed else self.style.SUCCESS
+            self.stdout.write(style(f"Starter audio bundle {version}: {rendered} segments, {failed} failed"))
@@ -0,0 +1,37 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from api.export import encode_export, export_records
+
+
+class Command(BaseCommand):
+    help = "Stream a user's sessions and messages as NDJSON (or a JSON array) to a file or stdout."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--output', '-o', help="File to write (default: stdout)")
+        parser.add_argument('--format', choices=['ndjson', 'json'], default='ndjson')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.using(options['database']).get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist")
+
+        chunks = encode_export(export_records(user, using=options['database']), fmt=options['format'], compress=options['gzip'])
+        out = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        written = 0
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+                written += len(chunk)
+        finally:
+            if options['output']:
+                out.close()
+
+        if options['output']:
+            self.stderr.write(self.style.SUCCESS(f"Wrote {written / 1024:.1f}KiB to {options['output']}"))
@@ -0,0 +1,85 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from api.archive import purge_archive
+from api.history_cache import invalidate_history
+from api.models import ChatSession, ChatMessage, ChatSessionArchive
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete messages older than CHAT_RETENTION_DAYS, then sessions idle for that long, "
+        "then the expired messages inside archived sessions, in small batches (one short "
+        "transaction each) with a pause in between. Every batch is selected from what's "
+        "still expired, so an interrupted run just starts over. Needs a shared cache "
+        "(REDIS_URL) so the web server stops serving purged messages from its history cache."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.CHAT_RETENTION_DAYS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--sleep', type=float, default=0.5, help="Seconds between batches")
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        if not options['days']:
+            raise CommandError("Retention is disabled: set CHAT_RETENTION_DAYS or pass --days")
+        cutoff = timezone.now() - timedelta(days=options['days'])
+
+        messages = ChatMessage.objects.filter(created_at__lt=cutoff)
+        sessions = ChatSession.objects.filter(updated_at__lt=cutoff)
+        # Only sessions started before the cutoff can hold expired messages
+        archives = ChatSessionArchive.objects.filter(session__created_at__lt=cutoff)
+        if options['dry_run']:
+            self.stdout.write(
+                f"Before {cutoff:%Y-%m-%d}: {messages.count()} messages, {sessions.count()} sessions would be deleted, "
+                f"{archives.count()} archives checked"
+            )
+            return
+        if isinstance(caches['default'], LocMemCache):
+            # invalidate_history would only clear this process's copy
+            raise CommandError("The cache is per process (LocMem): set REDIS_URL so the web server sees the purge")
+
+        # Messages first, so each session delete below only cascades to a few leftovers
+        deleted = self.purge(messages, 'messages', options, self.delete_messages)
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} messages"))
+        deleted = self.purge(sessions, 'sessions', options, self.delete_sessions)
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} sessions"))
+        deleted = self.purge(archives, 'archived messages', options, lambda ids: self.delete_archived(ids, cutoff))
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} archived messages"))
+
+    def purge(self, queryset, label, options, delete_batch):
+        total = 0
+        last_id = 0
+        while True:
+            # Walk the primary key: each batch is an index range scan, not a rescan from the start
+            ids = list(queryset.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:options['batch_size']])
+            if not ids:
+                return total
+            with transaction.atomic():
+                total += delete_batch(ids)
+            last_id = ids[-1]
+            self.stdout.write(f"  {label}: {total} deleted (up to id {last_id})")
+            time.sleep(options['sleep'])
+
+    def delete_messages(self, ids):
+        session_ids = set(ChatMessage.objects.filter(id__in=ids).values_list('session_id', flat=True))
+        # No delete signals on ChatMessage: a single DELETE ... WHERE id IN (...)
+        count, _ = ChatMessage.objects.filter(id__in=ids).delete()
+        transaction.on_commit(lambda: [invalidate_history(session_id) for session_id in session_ids])
+        return count
+
+    def delete_sessions(self, ids):
+        ChatSession.objects.filter(id__in=ids).delete()
+        transaction.on_commit(lambda: [invalidate_history(session_id) for session_id in ids])
+        return len(ids)
+
+    def delete_archived(self, session_ids, cutoff):
+        return sum(purge_archive(session_id, cutoff) for session_id in session_ids)
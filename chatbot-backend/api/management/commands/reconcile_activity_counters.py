@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from api.models import UserProfile, ChatSession, ChatMessage
+from api.achievements import schedule_unlocks
+from api.gamification import xp_award
+from api.missions import sync_missions
+from api.progress_cache import invalidate_all_progress
+
+
+def count_subquery(queryset, user_field):
+    counted = (
+        queryset.filter(**{user_field: OuterRef('user_id')})
+        .order_by()
+        .values(user_field)
+        .annotate(c=Count('id'))
+        .values('c')
+    )
+    return Coalesce(Subquery(counted, output_field=IntegerField()), 0)
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfill the UserProfile activity counters from the chat tables. Counters are "
+        "lifetime totals, so they're only raised to the row counts, never lowered "
+        "(deleted chats still count). voice_turn_count isn't derivable and is left alone. "
+        "Profiles that are raised get the missions and achievements their counters now reach."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Profiles per UPDATE")
+
+    def handle(self, *args, **options):
+        counters = {
+            'user_message_count': count_subquery(ChatMessage.objects.filter(role='user'), 'session__user'),
+            'assistant_message_count': count_subquery(ChatMessage.objects.filter(role='assistant'), 'session__user'),
+            'session_count': count_subquery(ChatSession.objects.all(), 'user'),
+        }
+        updates = {field: Greatest(field, expression) for field, expression in counters.items()}
+
+        ids = list(UserProfile.objects.order_by('id').values_list('id', flat=True))
+        updated = raised = 0
+        for start in range(0, len(ids), options['batch_size']):
+            batch = ids[start:start + options['batch_size']]
+            # Short transactions: one batch of profiles locked at a time
+            with transaction.atomic():
+                before = {
+                    profile['id']: profile
+                    for profile in UserProfile.objects.filter(id__in=batch).values('id', *counters)
+                }
+                updated += UserProfile.objects.filter(id__in=batch).update(**updates)
+                for profile in UserProfile.objects.filter(id__in=batch):
+                    changes = {
+                        field: (before[profile.id][field], getattr(profile, field))
+                        for field in counters if getattr(profile, field) != before[profile.id][field]
+                    }
+                    if changes:
+                        raised += 1
+                        self.catch_up(profile, changes)
+
+        # Open missions show these counters as their progress
+        invalidate_all_progress()
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciled activity counters for {updated} profiles ({raised} raised)"
+        ))
+
+    def catch_up(self, profile, changes):
+        # Thresholds the raised counters passed were never crossed by a turn
+        xp = sync_missions(profile.user_id, profile)
+        if xp:
+            UserProfile.objects.filter(id=profile.id).update(**xp_award(xp))
+            changes['xp'] = (profile.xp, profile.xp + xp)
+        schedule_unlocks(profile.user_id, changes)
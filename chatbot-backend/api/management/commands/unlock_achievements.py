@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from api.achievements import unlock_for_existing_users
+from api.models import Achievement, UserAchievement
+
+
+class Command(BaseCommand):
+    help = (
+        "Unlock every achievement for the users whose profile stats already reach it. "
+        "Turns only unlock thresholds they cross, so this catches up stats reached before "
+        "(or without) a crossing. Idempotent: existing unlocks are skipped."
+    )
+
+    def handle(self, *args, **options):
+        before = UserAchievement.objects.count()
+        for achievement in Achievement.objects.order_by('id'):
+            unlock_for_existing_users(achievement)
+        self.stdout.write(self.style.SUCCESS(
+            f"Unlocked {UserAchievement.objects.count() - before} achievements"
+        ))
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_userprofile_fluency_score_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['session', 'created_at', 'id'], name='chatmsg_session_created_idx'),
+        ),
+    ]
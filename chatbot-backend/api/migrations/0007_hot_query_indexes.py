@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_chatmessage_session_created_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['session', 'role'], name='chatmsg_session_role_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatsession',
+            index=models.Index(fields=['user', '-updated_at', '-id'], name='chatsession_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usermission',
+            index=models.Index(condition=models.Q(('completed', False)), fields=['user'], name='usermission_user_open_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='assistant_message_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='session_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='user_message_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='voice_turn_count',
+            field=models.IntegerField(default=0),
+        ),
+    ]
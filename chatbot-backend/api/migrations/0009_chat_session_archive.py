@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:45
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_userprofile_activity_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatSessionArchive',
+            fields=[
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='archive', serialize=False, to='api.chatsession')),
+                ('data', models.BinaryField()),
+                ('message_count', models.IntegerField()),
+                ('last_message', models.TextField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='chatmessage',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
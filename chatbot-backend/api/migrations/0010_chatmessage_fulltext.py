@@ -0,0 +1,65 @@
+from django.db import migrations
+
+# Full-text index over ChatMessage.content, maintained by the database itself
+# so every write path (create, bulk_create, archive/rehydrate, deletes) keeps it
+# current. Queried with raw SQL in api/search.py.
+
+SQLITE_FORWARD = [
+    # External-content FTS5 table: stores only the index, the text stays in api_chatmessage
+    """CREATE VIRTUAL TABLE api_chatmessage_fts USING fts5(
+        content, content='api_chatmessage', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER api_chatmessage_fts_ai AFTER INSERT ON api_chatmessage BEGIN
+        INSERT INTO api_chatmessage_fts(rowid, content) VALUES (new.id, new.content);
+    END""",
+    """CREATE TRIGGER api_chatmessage_fts_ad AFTER DELETE ON api_chatmessage BEGIN
+        INSERT INTO api_chatmessage_fts(api_chatmessage_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    END""",
+    """CREATE TRIGGER api_chatmessage_fts_au AFTER UPDATE OF content ON api_chatmessage BEGIN
+        INSERT INTO api_chatmessage_fts(api_chatmessage_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO api_chatmessage_fts(rowid, content) VALUES (new.id, new.content);
+    END""",
+    # Index the existing rows
+    "INSERT INTO api_chatmessage_fts(api_chatmessage_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS api_chatmessage_fts_au",
+    "DROP TRIGGER IF EXISTS api_chatmessage_fts_ad",
+    "DROP TRIGGER IF EXISTS api_chatmessage_fts_ai",
+    "DROP TABLE IF EXISTS api_chatmessage_fts",
+]
+
+# 'simple' config: messages mix English and Spanish, so no language stemming
+POSTGRES_FORWARD = [
+    """ALTER TABLE api_chatmessage ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED""",
+    "CREATE INDEX api_chatmessage_search_gin ON api_chatmessage USING GIN (search_vector)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS api_chatmessage_search_gin",
+    "ALTER TABLE api_chatmessage DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def run(statements_by_vendor):
+    def apply(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_chat_session_archive'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            run({'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRES_REVERSE}),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def drop_duplicate_user_missions(apps, schema_editor):
+    # get_or_create could race: keep one row per (user, mission), a completed one if any
+    UserMission = apps.get_model('api', 'UserMission')
+    seen = set()
+    duplicates = []
+    rows = UserMission.objects.order_by('user_id', 'mission_id', '-completed', 'id').values_list('id', 'user_id', 'mission_id')
+    for pk, user_id, mission_id in rows.iterator():
+        if (user_id, mission_id) in seen:
+            duplicates.append(pk)
+        else:
+            seen.add((user_id, mission_id))
+    for start in range(0, len(duplicates), 1000):
+        UserMission.objects.filter(id__in=duplicates[start:start + 1000]).delete()
+
+
+def provision_existing_users(apps, schema_editor):
+    # Rows used to be created by GET /api/progress/; now only on user/mission creation
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Mission = apps.get_model('api', 'Mission')
+    UserMission = apps.get_model('api', 'UserMission')
+    mission_ids = list(Mission.objects.values_list('id', flat=True))
+    if not mission_ids:
+        return
+    batch = []
+    for user_id in User.objects.values_list('id', flat=True).iterator():
+        batch.extend(UserMission(user_id=user_id, mission_id=mission_id) for mission_id in mission_ids)
+        if len(batch) >= 1000:
+            UserMission.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    UserMission.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_chatmessage_fulltext'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_user_missions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='usermission',
+            constraint=models.UniqueConstraint(fields=('user', 'mission'), name='usermission_user_mission_uniq'),
+        ),
+        migrations.RunPython(provision_existing_users, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def drop_duplicate_unlocks(apps, schema_editor):
+    # Keep the earliest unlock of each (user, achievement)
+    UserAchievement = apps.get_model('api', 'UserAchievement')
+    seen = set()
+    duplicates = []
+    rows = UserAchievement.objects.order_by('user_id', 'achievement_id', 'unlocked_at', 'id').values_list('id', 'user_id', 'achievement_id')
+    for pk, user_id, achievement_id in rows.iterator():
+        if (user_id, achievement_id) in seen:
+            duplicates.append(pk)
+        else:
+            seen.add((user_id, achievement_id))
+    for start in range(0, len(duplicates), 1000):
+        UserAchievement.objects.filter(id__in=duplicates[start:start + 1000]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_usermission_unique_and_provisioning'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_unlocks, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='userachievement',
+            constraint=models.UniqueConstraint(fields=('user', 'achievement'), name='userachievement_user_achievement_uniq'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+from django.db.models import F
+from django.utils import timezone
+
+# GET /api/progress/ used to complete missions a user had already reached; it's
+# read-only now and missions complete when a stat crosses them (api/missions.py),
+# so close the ones reached before that once.
+CONDITION_STATS = {
+    'message_count': 'user_message_count',
+    'time_spent': 'total_time_minutes',
+    'login_streak': 'streak',
+}
+
+
+def complete_satisfied_missions(apps, schema_editor):
+    Mission = apps.get_model('api', 'Mission')
+    UserMission = apps.get_model('api', 'UserMission')
+    UserProfile = apps.get_model('api', 'UserProfile')
+    now = timezone.now()
+    for mission in Mission.objects.all():
+        stat = CONDITION_STATS.get(mission.condition_type)
+        if stat is None:
+            continue
+        satisfied = UserProfile.objects.filter(**{f'{stat}__gte': mission.condition_value}).values('user_id')
+        rows = list(UserMission.objects.filter(mission=mission, completed=False, user_id__in=satisfied).values_list('id', 'user_id'))
+        for start in range(0, len(rows), 1000):
+            batch = rows[start:start + 1000]
+            UserMission.objects.filter(id__in=[pk for pk, _ in batch]).update(
+                completed=True, completed_at=now, progress=mission.condition_value
+            )
+            UserProfile.objects.filter(user_id__in=[user_id for _, user_id in batch]).update(
+                xp=F('xp') + mission.xp_reward
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_userachievement_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(complete_satisfied_missions, migrations.RunPython.noop),
+    ]
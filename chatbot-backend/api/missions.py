@@ -0,0 +1,163 @@
+"""
+Mission engine. Progress changes arrive as typed events (a message sent,
+time added, the streak changing) with the stat's value before and after;
+only missions of the matching condition type are looked at, and the ones
+whose threshold was crossed are found by bisecting a cached table sorted by
+condition_value. Most events cross nothing and cost no queries.
+"""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Mission, UserMission, UserProfile
+from .progress_cache import invalidate_progress, invalidate_all_progress
+from .thresholds import crossed, threshold_table
+
+MESSAGE_SENT = 'message_sent'
+TIME_ADDED = 'time_added'
+STREAK_CHANGED = 'streak_changed'
+
+# Mission.condition_type each event advances
+EVENT_CONDITIONS = {
+    MESSAGE_SENT: 'message_count',
+    TIME_ADDED: 'time_spent',
+    STREAK_CHANGED: 'login_streak',
+}
+# UserProfile field each condition type measures
+CONDITION_STATS = {
+    'message_count': 'user_message_count',
+    'time_spent': 'total_time_minutes',
+    'login_streak': 'streak',
+}
+
+MISSION_TABLE_KEY = "missions:table"
+PROVISION_BATCH_SIZE = 1000
+
+
+def mission_table():
+    return threshold_table(MISSION_TABLE_KEY, Mission.objects.values(
+        'id', 'condition_type', 'condition_value', 'xp_reward'
+    ))
+
+
+def invalidate_mission_table():
+    cache.delete(MISSION_TABLE_KEY)
+
+
+def crossed_missions(condition_type, old, new):
+    """Missions of that type with old < condition_value <= new."""
+    return crossed(mission_table(), condition_type, old, new)
+
+
+def complete_missions(user, missions, value):
+    """
+    Completes the user's open UserMissions among `missions` (table rows).
+    Writes only those rows, with one bulk_update; returns the XP they award,
+    which the caller adds to the profile (api.gamification).
+    """
+    rewards = {mission['id']: mission['xp_reward'] for mission in missions}
+    if not rewards:
+        return 0
+    # Locked, so a concurrent turn or provision_mission can't award the same mission twice
+    with transaction.atomic(savepoint=False):
+        user_missions = list(
+            UserMission.objects.select_for_update().filter(user=user, completed=False, mission_id__in=rewards)
+        )
+        if not user_missions:
+            return 0
+
+        now = timezone.now()
+        for um in user_missions:
+            um.progress = int(value)
+            um.completed = True
+            um.completed_at = now
+        UserMission.objects.bulk_update(user_missions, ['progress', 'completed', 'completed_at'])
+    return sum(rewards[um.mission_id] for um in user_missions)
+
+
+def dispatch(user, event, old, new):
+    """Handles one event. Returns the XP of the missions it completed."""
+    if new <= old:
+        # Streak reset: nothing can be crossed going down
+        return 0
+    return complete_missions(user, crossed_missions(EVENT_CONDITIONS[event], old, new), new)
+
+
+def sync_missions(user, profile):
+    """
+    Completes every open mission the profile already satisfies, whatever
+    crossed it (missions added after the user passed their threshold).
+    One query per condition type with a threshold reached, at most.
+    Returns their XP.
+    """
+    xp = 0
+    for condition_type, stat in CONDITION_STATS.items():
+        value = getattr(profile, stat)
+        xp += complete_missions(user, crossed_missions(condition_type, float('-inf'), value), value)
+    return xp
+
+
+def provision_user(user):
+    """A new user's UserMission rows, one INSERT for all missions."""
+    UserMission.objects.bulk_create(
+        [UserMission(user=user, mission_id=mission_id) for mission_id in Mission.objects.values_list('id', flat=True)],
+        ignore_conflicts=True,
+    )
+    from .gamification import xp_award
+
+    profile = UserProfile.objects.filter(user=user).first()
+    if profile:
+        # Missions with a zero threshold
+        xp = sync_missions(user, profile)
+        if xp:
+            UserProfile.objects.filter(user=user).update(**xp_award(xp))
+
+
+def provision_mission(mission):
+    """
+    A mission's UserMission rows for every user (one INSERT per
+    PROVISION_BATCH_SIZE users, existing rows skipped), completed right away
+    for users already past its threshold.
+    """
+    from .gamification import xp_award
+
+    user_ids = User.objects.order_by('id').values_list('id', flat=True).iterator(chunk_size=PROVISION_BATCH_SIZE)
+    batch = []
+    for user_id in user_ids:
+        batch.append(UserMission(user_id=user_id, mission=mission))
+        if len(batch) == PROVISION_BATCH_SIZE:
+            UserMission.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    UserMission.objects.bulk_create(batch, ignore_conflicts=True)
+
+    # Every payload lists the new rows
+    invalidate_all_progress()
+    stat = CONDITION_STATS.get(mission.condition_type)
+    if stat is None:
+        return
+    satisfied = UserProfile.objects.filter(**{f'{stat}__gte': mission.condition_value}).values('user_id')
+    while True:
+        with transaction.atomic():
+            rows = list(
+                UserMission.objects.select_for_update()
+                .filter(mission=mission, completed=False, user_id__in=satisfied)
+                .values_list('id', 'user_id')[:PROVISION_BATCH_SIZE]
+            )
+            if not rows:
+                return
+            UserMission.objects.filter(id__in=[pk for pk, _ in rows]).update(
+                completed=True, completed_at=timezone.now(), progress=mission.condition_value
+            )
+            UserProfile.objects.filter(user_id__in=[user_id for _, user_id in rows]).update(
+                **xp_award(mission.xp_reward)
+            )
+            invalidate_progress(*[user_id for _, user_id in rows])
+
+
+def mission_progress(user_mission, profile):
+    """Progress of a mission: frozen once completed, otherwise the live profile stat."""
+    stat = CONDITION_STATS.get(user_mission.mission.condition_type)
+    if user_mission.completed or profile is None or stat is None:
+        return user_mission.progress
+    return int(getattr(profile, stat))
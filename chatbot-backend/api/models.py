@@ -1,7 +1,9 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from django.utils import timezone
+from .history_cache import append_message
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
@@ -13,6 +15,12 @@ class UserProfile(models.Model):
     fluency_score = models.IntegerField(default=0, help_text="Oral Fluency Score 0-100")
     vocabulary_score = models.IntegerField(default=0, help_text="Vocabulary Mastery Score 0-100")
     last_activity = models.DateTimeField(auto_now=True)
+    # Lifetime activity counters, incremented with F() as turns are written
+    # (manage.py reconcile_activity_counters backfills them from the tables)
+    user_message_count = models.IntegerField(default=0)
+    assistant_message_count = models.IntegerField(default=0)
+    voice_turn_count = models.IntegerField(default=0)
+    session_count = models.IntegerField(default=0)
 
     def __str__(self):
         return f"{self.user.username} - Level {self.level}"
@@ -32,6 +40,14 @@ class ChatSession(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     metadata = models.JSONField(default=dict, blank=True)
+    # Set while the messages live compressed in ChatSessionArchive (api/archive.py)
+    archived_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Sidebar: a user's sessions by last activity (SessionListView)
+            models.Index(fields=['user', '-updated_at', '-id'], name='chatsession_user_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.user.username})"
@@ -45,11 +61,38 @@ class ChatMessage(models.Model):
     session = models.ForeignKey(ChatSession, on_delete=models.CASCADE, related_name='messages')
     role = models.CharField(max_length=20, choices=ROLE_CHOICES)
     content = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
+    # A default rather than auto_now_add, so rehydrated archives keep their timestamps
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # History pages: keyset on (created_at, id) within a session
+            models.Index(fields=['session', 'created_at', 'id'], name='chatmsg_session_created_idx'),
+            # message_count missions: a user's messages by role, counted from the index
+            models.Index(fields=['session', 'role'], name='chatmsg_session_role_idx'),
+        ]
 
     def __str__(self):
         return f"{self.role}: {self.content[:50]}..."
 
+class ChatSessionArchive(models.Model):
+    """Messages of an idle session as one zlib-compressed JSON blob."""
+    session = models.OneToOneField(ChatSession, on_delete=models.CASCADE, primary_key=True, related_name='archive')
+    data = models.BinaryField()
+    message_count = models.IntegerField()
+    # Preview for the session list while archived
+    last_message = models.TextField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Archive of {self.session_id} ({self.message_count} messages)"
+
+@receiver(post_save, sender=ChatMessage)
+def append_to_history_cache(sender, instance, created, **kwargs):
+    # After commit, so a rolled-back turn never reaches the cache
+    if created:
+        transaction.on_commit(lambda: append_message(instance))
+
 class Mission(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField()
@@ -64,6 +107,19 @@ class Mission(models.Model):
     def __str__(self):
         return self.title
 
+@receiver([post_save, post_delete], sender=Mission)
+def refresh_mission_table(sender, **kwargs):
+    from .missions import invalidate_mission_table
+    from .progress_cache import invalidate_all_progress
+    transaction.on_commit(invalidate_mission_table)
+    invalidate_all_progress()
+
+@receiver(post_save, sender=Mission)
+def provision_new_mission(sender, instance, **kwargs):
+    # Also on edits: a lowered condition_value may complete it for more users
+    from .missions import provision_mission
+    transaction.on_commit(lambda: provision_mission(instance))
+
 class UserMission(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='missions')
     mission = models.ForeignKey(Mission, on_delete=models.CASCADE)
@@ -71,9 +127,27 @@ class UserMission(models.Model):
     completed = models.BooleanField(default=False)
     completed_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # check_missions: a user's missions still in progress. Partial, because
+            # completed=False compiles to NOT "completed", which can't seek a column index
+            models.Index(fields=['user'], condition=models.Q(completed=False), name='usermission_user_open_idx'),
+        ]
+        constraints = [
+            # Provisioning uses bulk_create(ignore_conflicts=True) against this
+            models.UniqueConstraint(fields=['user', 'mission'], name='usermission_user_mission_uniq'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.mission.title}"
 
+@receiver(post_save, sender=User)
+def provision_new_user(sender, instance, created, **kwargs):
+    # After create_user_profile (registered earlier)
+    if created:
+        from .missions import provision_user
+        provision_user(instance)
+
 class Achievement(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField()
@@ -84,10 +158,29 @@ class Achievement(models.Model):
     def __str__(self):
         return self.title
 
+@receiver([post_save, post_delete], sender=Achievement)
+def refresh_achievement_table(sender, **kwargs):
+    from .achievements import invalidate_achievement_table
+    from .progress_cache import invalidate_all_progress
+    transaction.on_commit(invalidate_achievement_table)
+    invalidate_all_progress()
+
+@receiver(post_save, sender=Achievement)
+def unlock_new_achievement(sender, instance, **kwargs):
+    # Users already past the threshold, off the request path
+    from .achievements import run_in_background, unlock_for_existing_users
+    transaction.on_commit(lambda: run_in_background(unlock_for_existing_users, instance))
+
 class UserAchievement(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='achievements')
     achievement = models.ForeignKey(Achievement, on_delete=models.CASCADE)
     unlocked_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            # At most one unlock per achievement: bulk inserts use ignore_conflicts
+            models.UniqueConstraint(fields=['user', 'achievement'], name='userachievement_user_achievement_uniq'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.achievement.title}"
@@ -1,5 +1,7 @@
+import asyncio
 import openai
 import os
+import weakref
 from django.conf import settings
 from dotenv import load_dotenv
 
@@ -7,6 +9,17 @@ load_dotenv()
 
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
+# Cliente async por event loop (reutiliza el pool de conexiones httpx). Bajo ASGI
+# hay un solo loop; bajo WSGI cada async_to_sync abre uno nuevo y las conexiones
+# de otro loop ya cerrado no se pueden reutilizar
+_async_clients = weakref.WeakKeyDictionary()
+
+def get_async_client():
+    loop = asyncio.get_running_loop()
+    if loop not in _async_clients:
+        _async_clients[loop] = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _async_clients[loop]
+
 def transcribe_audio(audio_file):
     """
     Transcribes audio using OpenAI Whisper model.
@@ -23,6 +36,24 @@ def transcribe_audio(audio_file):
         print(f"Error transcribing audio: {e}")
         return None
 
+async def transcribe_audio_async(audio_file):
+    """
+    Async version of transcribe_audio for the ASGI chat view.
+    """
+    try:
+        audio_file.seek(0)
+        transcript = await get_async_client().audio.transcriptions.create(
+            model="whisper-1",
+            file=(audio_file.name, audio_file.read(), "audio/webm"),
+            temperature=0,
+            response_format="verbose_json"
+        )
+        audio_file.seek(0)
+        return transcript.text, transcript.language
+    except Exception as e:
+        print(f"Error transcribing audio: {e}")
+        return None
+
 def get_chat_response(messages, stream=False):
     """
     Gets a response from OpenAI GPT-4o-mini model.
@@ -47,6 +78,44 @@ def get_chat_response(messages, stream=False):
             return error_gen()
         return "Lo siento, hubo un error al procesar tu solicitud."
 
+async def get_chat_response_async(messages):
+    """
+    Streams a response from GPT-4o-mini using the async client.
+    Returns an async iterator of chunks, or None on error.
+    """
+    try:
+        return await get_async_client().chat.completions.create(
+            model="gpt-4o-mini",
+            messages=messages,
+            stream=True
+        )
+    except Exception as e:
+        print(f"Error getting chat response: {e}")
+        return None
+
+async def summarize_conversation_async(previous_summary, messages):
+    """
+    Rolling summary for long sessions: folds `messages` (dicts with role/content)
+    into `previous_summary`. Returns the new summary, or None on error.
+    """
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    prompt = (
+        "Update the summary of an English tutoring conversation with the new messages. "
+        "Keep the student's goals, level, recurring mistakes, topics covered and anything "
+        "the tutor promised to follow up on. Answer with the summary only, in under 200 words.\n\n"
+        f"Current summary:\n{previous_summary or '(none)'}\n\nNew messages:\n{transcript}"
+    )
+    try:
+        response = await get_async_client().chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=400
+        )
+        return response.choices[0].message.content
+    except Exception as e:
+        print(f"Error summarizing conversation: {e}")
+        return None
+
 def generate_speech(text):
     """
     Generates speech from text using OpenAI TTS.
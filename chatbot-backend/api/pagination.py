@@ -0,0 +1,112 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class SessionCursorPagination(CursorPagination):
+    """
+    Sidebar list, most recently active first. A cursor instead of page numbers
+    so sessions bumped by a new message don't shift or repeat pages.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-updated_at', '-id')
+
+
+class MessageKeysetPagination(BasePagination):
+    """
+    Keyset pagination on (created_at, id) for chat history. Without a cursor it
+    returns the latest page; ?before=<cursor> pages back to older messages and
+    ?after=<cursor> forward to newer ones. Every page is a single range scan on
+    the (session, created_at, id) index, so it costs the same however deep it is.
+
+    Results are oldest first; `previous` links to the older page and `next` to
+    the newer one (null when there's nothing there).
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    before_query_param = 'before'
+    after_query_param = 'after'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        after = self.decode_cursor(request.query_params.get(self.after_query_param))
+        before = self.decode_cursor(request.query_params.get(self.before_query_param))
+
+        if after:
+            created_at, pk = after
+            rows = list(
+                queryset.filter(created_at__gte=created_at)
+                .filter(Q(created_at__gt=created_at) | Q(id__gt=pk))
+                .order_by('created_at', 'id')[:page_size + 1]
+            )
+            self.has_newer = len(rows) > page_size
+            self.has_older = True
+            rows = rows[:page_size]
+        else:
+            if before:
+                created_at, pk = before
+                # The plain bound lets the index seek; the OR only breaks created_at ties
+                queryset = queryset.filter(created_at__lte=created_at).filter(Q(created_at__lt=created_at) | Q(id__lt=pk))
+            rows = list(queryset.order_by('-created_at', '-id')[:page_size + 1])
+            self.has_older = len(rows) > page_size
+            self.has_newer = before is not None
+            rows = rows[:page_size]
+            rows.reverse()
+
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def encode_cursor(self, message):
+        raw = f"{message.created_at.isoformat()}|{message.id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, encoded):
+        if not encoded:
+            return None
+        try:
+            created_at, pk = base64.urlsafe_b64decode(encoded.encode()).decode().rsplit('|', 1)
+            return datetime.fromisoformat(created_at), int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_link(self, param, message):
+        url = remove_query_param(self.base_url, self.before_query_param)
+        url = remove_query_param(url, self.after_query_param)
+        return replace_query_param(url, param, self.encode_cursor(message))
+
+    def get_previous_link(self):
+        if not (self.page and self.has_older):
+            return None
+        return self.get_link(self.before_query_param, self.page[0])
+
+    def get_next_link(self):
+        if not (self.page and self.has_newer):
+            return None
+        return self.get_link(self.after_query_param, self.page[-1])
+
+    def get_paginated_data(self, data):
+        return {
+            'previous': self.get_previous_link(),
+            'next': self.get_next_link(),
+            'results': data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
@@ -0,0 +1,67 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+# Bumped when a Mission or Achievement changes: every user's payload lists them
+PROGRESS_GENERATION_KEY = "progress:generation"
+
+
+def version_key(user_id):
+    return f"progress:version:{user_id}"
+
+
+def progress_key(user_id):
+    """
+    Versioned, not deleted on invalidation: a miss that read the database
+    before a write committed stores its payload under the old key, which no
+    one reads any more, instead of overwriting the invalidation.
+    """
+    versions = cache.get_many([PROGRESS_GENERATION_KEY, version_key(user_id)])
+    generation = versions.get(PROGRESS_GENERATION_KEY, 0)
+    version = versions.get(version_key(user_id), 0)
+    return f"progress:{generation}:{user_id}:{version}"
+
+
+def build_progress(user):
+    """The /api/progress/ payload, read-only (missions and achievements prefetched)."""
+    from django.db.models import Prefetch, prefetch_related_objects
+    from .models import UserProfile, UserMission, UserAchievement
+    from .serializers import UserProfileSerializer
+
+    profile = UserProfile.objects.filter(user=user).select_related('user').first() or UserProfile(user=user)
+    prefetch_related_objects(
+        [profile],
+        Prefetch('user__missions', queryset=UserMission.objects.select_related('mission').order_by('id')),
+        Prefetch('user__achievements', queryset=UserAchievement.objects.select_related('achievement').order_by('id')),
+    )
+    return UserProfileSerializer(profile).data
+
+
+def load_progress(user):
+    """
+    (data, etag, last_modified) for the user's progress payload. Served from
+    the cache; a miss builds it and stamps it with the build time, which is
+    never older than the last invalidation.
+    """
+    key = progress_key(user.id)
+    entry = cache.get(key)
+    if entry is None:
+        data = build_progress(user)
+        body = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True).encode()
+        entry = (data, hashlib.md5(body).hexdigest(), int(time.time()))
+        cache.set(key, entry, settings.PROGRESS_CACHE_TTL)
+    return entry
+
+
+def invalidate_progress(*user_ids):
+    """Moves the users to a new cache key once the current transaction commits."""
+    transaction.on_commit(lambda: cache.set_many({version_key(user_id): time.time_ns() for user_id in user_ids}, None))
+
+
+def invalidate_all_progress():
+    transaction.on_commit(lambda: cache.set(PROGRESS_GENERATION_KEY, time.time_ns(), None))
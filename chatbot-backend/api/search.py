@@ -0,0 +1,106 @@
+import html
+import re
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connections, router
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ChatMessage
+
+# Highlight markers: control characters can't come from the tokenizer output,
+# so they survive html-escaping and are swapped for <mark> afterwards
+MARK_START = "\x02"
+MARK_END = "\x03"
+SNIPPET_WORDS = 16
+
+
+def highlight(snippet):
+    return html.escape(snippet).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+
+def db_datetime(value):
+    # Raw cursors skip Django's converters: SQLite returns naive UTC text
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if settings.USE_TZ and timezone.is_naive(value):
+        value = timezone.make_aware(value, dt_timezone.utc)
+    return value
+
+
+def fts5_query(text):
+    """
+    User input as an FTS5 query: every word must match, the last one as a
+    prefix (search-as-you-type). Quoting each token keeps FTS5 syntax
+    characters (", *, -, NEAR, ...) from raising errors.
+    """
+    tokens = re.findall(r"\w+", text)
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search_messages(user, text, limit, offset=0):
+    """
+    Ranked full-text search over the user's messages (archived sessions are
+    not indexed until reopened). Returns rows as dicts with id, session_id,
+    session_title, role, created_at and an HTML `snippet` with <mark> hits.
+    """
+    # Raw SQL bypasses the router: ask it which alias reads go to (replica or default)
+    connection = connections[router.db_for_read(ChatMessage)]
+    if connection.vendor == 'sqlite':
+        query = fts5_query(text)
+        if not query:
+            return []
+        sql = f"""
+            SELECT m.id, m.session_id, s.title, m.role, m.created_at,
+                   snippet(api_chatmessage_fts, 0, %s, %s, '…', {SNIPPET_WORDS})
+            FROM api_chatmessage_fts
+            JOIN api_chatmessage m ON m.id = api_chatmessage_fts.rowid
+            JOIN api_chatsession s ON s.id = m.session_id
+            WHERE api_chatmessage_fts MATCH %s AND s.user_id = %s
+            ORDER BY bm25(api_chatmessage_fts), m.id DESC
+            LIMIT %s OFFSET %s
+        """
+        params = [MARK_START, MARK_END, query, user.id, limit, offset]
+    elif connection.vendor == 'postgresql':
+        if not text.strip():
+            return []
+        sql = f"""
+            SELECT m.id, m.session_id, s.title, m.role, m.created_at,
+                   ts_headline('simple', m.content, q,
+                               'StartSel=' || %s || ', StopSel=' || %s || ', MaxWords={SNIPPET_WORDS}, MinWords=5')
+            FROM api_chatmessage m
+            JOIN api_chatsession s ON s.id = m.session_id,
+                 websearch_to_tsquery('simple', %s) q
+            WHERE m.search_vector @@ q AND s.user_id = %s
+            ORDER BY ts_rank_cd(m.search_vector, q) DESC, m.id DESC
+            LIMIT %s OFFSET %s
+        """
+        params = [MARK_START, MARK_END, text, user.id, limit, offset]
+    else:
+        # No full-text index for this backend: unranked substring match
+        messages = (
+            ChatMessage.objects.filter(session__user=user, content__icontains=text.strip())
+            .select_related('session').order_by('-id')[offset:offset + limit]
+        )
+        return [{
+            'id': m.id, 'session_id': m.session_id, 'session_title': m.session.title,
+            'role': m.role, 'created_at': m.created_at, 'snippet': html.escape(m.content[:200]),
+        } for m in messages]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    return [{
+        'id': pk,
+        'session_id': session_id,
+        'session_title': title,
+        'role': role,
+        'created_at': db_datetime(created_at),
+        'snippet': highlight(snippet),
+    } for pk, session_id, title, role, created_at, snippet in rows]
@@ -0,0 +1,134 @@
+import re
+
+TERMINALS = ".!?"
+# Closing quotes/brackets allowed between the terminal and the whitespace: 'is...'. / "hi."
+CLOSERS = "\"'”’»]"
+OPENERS = "\"'“‘«[¡¿("
+
+# Words that end in a period without ending the sentence (lowercase, no final period)
+ABBREVIATIONS = {
+    # English
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "e.g", "i.e",
+    "a.m", "p.m", "u.s", "u.k", "approx", "dept", "inc", "ltd", "co",
+    "feb", "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec",
+    # Spanish
+    "sra", "srta", "dra", "ud", "uds", "lic", "ing", "pág", "pag", "núm", "num",
+    "aprox", "p.ej", "ej", "av", "avda", "dpto", "tel", "ee.uu", "abr", "dic",
+}
+# Abbreviations that are also ordinary words, or often end a sentence ("two days
+# ago.", "el mar.", "pears, etc."): only kept when a digit or lowercase word follows
+AMBIGUOUS_ABBREVIATIONS = {"ago", "mar", "jan", "ene", "fig", "etc"}
+# A "(" still open after this many characters is taken as unclosed
+MAX_PARENTHETICAL_CHARS = 200
+
+
+def clean_text_for_speech(text):
+    # Remove content in parentheses (e.g., translations)
+    return re.sub(r'\s*\(.*?\)', '', text).strip()
+
+
+class SentenceSegmenter:
+    """
+    Incremental sentence splitter for streamed LLM text. feed() takes each
+    delta and returns the sentences it completed (each with the whitespace
+    that ended it); every character is looked at once, so a whole reply is
+    O(n) no matter how it's chunked.
+
+    A sentence ends at . ! ? (plus closing quotes) followed by whitespace, except:
+    - after known English/Spanish abbreviations ("Mr.", "Sra.", "e.g.") and initials ("J."),
+      and after ones that are also words ("ago.", "mar.") if a digit or lowercase follows
+    - after a list number at the start of a sentence ("1. ")
+    - inside parentheses, i.e. the translations clean_text_for_speech strips (up to
+      MAX_PARENTHETICAL_CHARS, and never across a newline, so a stray "(" can't
+      stop splitting for the rest of the reply)
+    Decimals ("3.5") never split: the period isn't followed by whitespace.
+    """
+
+    def __init__(self, break_on_newline=False):
+        self.break_on_newline = break_on_newline
+        self._reset()
+
+    def _reset(self):
+        self._chars = []   # current sentence (list: no quadratic string concat)
+        self._word = []    # current non-space run, for the abbreviation check
+        self._words = 0    # words completed in the current sentence
+        self._pending = False
+        self._deferred = False  # ambiguous abbreviation: decided by the next character
+        self._depth = 0
+        self._paren_start = 0
+
+    def _emit(self):
+        sentence = "".join(self._chars)
+        self._reset()
+        return sentence
+
+    def _ends_sentence(self):
+        word = "".join(self._word).rstrip(CLOSERS)
+        if not word.endswith(".") or word.endswith(".."):
+            return True  # ! ? or an ellipsis
+        core = word[:-1].lstrip(OPENERS)
+        if core.lower() in ABBREVIATIONS:
+            return False
+        if core.lower() in AMBIGUOUS_ABBREVIATIONS:
+            self._deferred = True
+            return False
+        if len(core) == 1 and core.isupper():
+            return False  # initial
+        if self._words == 0 and core.isdigit() and len(core) <= 3:
+            return False  # "1. " list marker
+        return True
+
+    def feed(self, delta):
+        sentences = []
+        for ch in delta:
+            if self._deferred and not ch.isspace():
+                self._deferred = False
+                if not (ch.isdigit() or ch.islower()):
+                    sentences.append(self._emit())
+
+            self._chars.append(ch)
+
+            if ch == "\n":
+                self._depth = 0  # brackets don't span paragraphs
+            elif self._depth and len(self._chars) - self._paren_start > MAX_PARENTHETICAL_CHARS:
+                self._depth = 0
+
+            if ch.isspace():
+                if self._pending and self._ends_sentence():
+                    sentences.append(self._emit())
+                    continue
+                if ch == "\n" and self.break_on_newline and self._depth == 0 and "".join(self._chars).strip():
+                    sentences.append(self._emit())
+                    continue
+                self._pending = False
+                if self._word:
+                    self._words += 1
+                    self._word = []
+                continue
+
+            self._word.append(ch)
+            if ch == "(":
+                if not self._depth:
+                    self._paren_start = len(self._chars)
+                self._depth += 1
+            elif ch == ")":
+                self._depth = max(0, self._depth - 1)
+
+            if ch in TERMINALS:
+                self._pending = self._depth == 0
+            elif ch not in CLOSERS:
+                self._pending = False
+        return sentences
+
+    def flush(self):
+        """Whatever is left once the stream ends (may be empty)"""
+        return self._emit()
+
+
+def split_starter_response(response_text):
+    """Split a fixed reply into sentences/segments to stream audio progressively"""
+    segmenter = SentenceSegmenter(break_on_newline=True)
+    chunks = segmenter.feed(response_text) + [segmenter.flush()]
+
+    # Filter empty chunks
+    return [c for c in chunks if c.strip()]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers
+from .missions import mission_progress
 from .models import UserProfile, ChatSession, ChatMessage, Mission, UserMission, Achievement, UserAchievement
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -23,6 +24,12 @@ class MissionSerializer(serializers.ModelSerializer):
 
 class UserMissionSerializer(serializers.ModelSerializer):
     mission = MissionSerializer(read_only=True)
+    # Open missions aren't written on every turn: their progress is the live profile stat
+    progress = serializers.SerializerMethodField()
+
+    def get_progress(self, obj):
+        return mission_progress(obj, self.context.get('profile'))
+
     class Meta:
         model = UserMission
         fields = ('id', 'mission', 'progress', 'completed', 'completed_at')
@@ -42,19 +49,49 @@ class UserProfileSerializer(serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
     missions = UserMissionSerializer(source='user.missions', many=True, read_only=True)
     achievements = UserAchievementSerializer(source='user.achievements', many=True, read_only=True)
-    
+    # Derived from the other stats at read time, so GET /api/progress/ writes nothing
+    global_score = serializers.SerializerMethodField()
+
     class Meta:
         model = UserProfile
         fields = ('username', 'level', 'xp', 'streak', 'total_time_minutes', 'global_score', 'fluency_score', 'vocabulary_score', 'missions', 'achievements')
 
+    def get_global_score(self, obj):
+        # Score = (XP / 1000) * 50 + (Streak * 2) + (Level * 5)
+        # Capped at 100
+        raw_score = (obj.xp / 1000) * 50 + (obj.streak * 2) + (obj.level * 5)
+        return min(int(raw_score), 100)
+
+    def to_representation(self, instance):
+        # For UserMissionSerializer.get_progress
+        self.context.setdefault('profile', instance)
+        return super().to_representation(instance)
+
 class ChatMessageSerializer(serializers.ModelSerializer):
     class Meta:
         model = ChatMessage
         fields = ('id', 'role', 'content', 'created_at')
 
 class ChatSessionSerializer(serializers.ModelSerializer):
-    messages = ChatMessageSerializer(many=True, read_only=True)
-    
+    # Messages are paginated separately (SessionDetailView / MessageListView)
     class Meta:
         model = ChatSession
-        fields = ('id', 'title', 'created_at', 'updated_at', 'messages')
\ No newline at end of file
+        fields = ('id', 'title', 'created_at', 'updated_at')
+
+class ChatSessionSummarySerializer(serializers.ModelSerializer):
+    """Sidebar entry: no messages, just the annotated count and last-message preview."""
+    message_count = serializers.IntegerField(read_only=True)
+    last_message = serializers.CharField(read_only=True, allow_null=True)
+
+    class Meta:
+        model = ChatSession
+        fields = ('id', 'title', 'created_at', 'updated_at', 'message_count', 'last_message')
+
+class MessageSearchResultSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    session_id = serializers.IntegerField()
+    session_title = serializers.CharField()
+    role = serializers.CharField()
+    created_at = serializers.DateTimeField()
+    # HTML-escaped excerpt; matched terms wrapped in <mark>
+    snippet = serializers.CharField()
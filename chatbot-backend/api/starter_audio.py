@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+from django.conf import settings
+
+from .azure_services import TTS_OUTPUT_FORMAT
+from .personas import STARTER_RESPONSES, persona_voices
+from .segmenter import clean_text_for_speech, split_starter_response
+from .tts_cache import speech_cache_key
+
+# Audio of every starter reply segment for every persona voice, rendered at
+# deploy time by `manage.py build_starter_audio` (see build.sh):
+#   STARTER_AUDIO_DIR/<version>/manifest.json
+#   STARTER_AUDIO_DIR/<version>/<speech_cache_key>.mp3
+# The version is a hash of what gets rendered, so editing a starter text or a
+# persona voice makes the old bundle invisible and ChatView falls back to TTS
+# until the next build.
+
+
+def starter_segments():
+    """(voice_name, speech_text) for every starter segment and persona voice"""
+    speech_texts = []
+    for starter in STARTER_RESPONSES.values():
+        for chunk in split_starter_response(starter["response"]):
+            speech_text = clean_text_for_speech(chunk)
+            if speech_text and speech_text not in speech_texts:
+                speech_texts.append(speech_text)
+    return [(voice, text) for voice in persona_voices() for text in speech_texts]
+
+
+def segment_key(voice_name, speech_text):
+    return speech_cache_key(speech_text, voice_name, TTS_OUTPUT_FORMAT)
+
+
+def bundle_version():
+    keys = sorted(segment_key(voice, text) for voice, text in starter_segments())
+    return hashlib.sha256("\n".join(keys).encode()).hexdigest()[:16]
+
+
+def bundle_dir(version=None):
+    return os.path.join(settings.STARTER_AUDIO_DIR, version or bundle_version())
+
+
+def missing_segments(target):
+    """Keys of the current starter segments with no audio file in `target`"""
+    return [
+        key for key in (segment_key(voice, text) for voice, text in starter_segments())
+        if not os.path.exists(os.path.join(target, key + ".mp3"))
+    ]
+
+
+def build_bundle(synthesize, stdout=None, force=False):
+    """
+    Renders the current bundle with `synthesize(text, voice_name)` and removes
+    older versions. Returns (version, rendered, failed).
+    """
+    version = bundle_version()
+    target = bundle_dir(version)
+    manifest_path = os.path.join(target, "manifest.json")
+    if os.path.exists(manifest_path) and not force:
+        # A failed render or a lost file leaves the right version incomplete
+        missing = missing_segments(target)
+        if not missing:
+            if stdout:
+                stdout.write(f"Starter audio bundle {version} already built")
+            return version, 0, 0
+        if stdout:
+            stdout.write(f"Starter audio bundle {version} is missing {len(missing)} segments, re-rendering")
+
+    # Render into a temp dir and rename, so a running server never sees half a bundle
+    tmp_target = target + ".tmp"
+    shutil.rmtree(tmp_target, ignore_errors=True)
+    os.makedirs(tmp_target)
+
+    manifest = {"version": version, "output_format": TTS_OUTPUT_FORMAT, "segments": {}}
+    failed = 0
+    for voice_name, speech_text in starter_segments():
+        audio = synthesize(speech_text, voice_name)
+        if not audio:
+            failed += 1
+            if stdout:
+                stdout.write(f"  ✗ {voice_name}: {speech_text[:40]}")
+            continue
+        key = segment_key(voice_name, speech_text)
+        with open(os.path.join(tmp_target, key + ".mp3"), "wb") as f:
+            f.write(audio)
+        manifest["segments"][key] = {"voice": voice_name, "text": speech_text}
+
+    with open(os.path.join(tmp_target, "manifest.json"), "w") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp_target, target)
+
+    for name in os.listdir(settings.STARTER_AUDIO_DIR):
+        if name != version:
+            shutil.rmtree(os.path.join(settings.STARTER_AUDIO_DIR, name), ignore_errors=True)
+
+    return version, len(manifest["segments"]), failed
+
+
+_bundle = None
+_bundle_lock = threading.Lock()
+
+
+def load_starter_bundle():
+    """Loads the current bundle into memory once per process ({} if not built)"""
+    global _bundle
+    with _bundle_lock:
+        if _bundle is None:
+            audio = {}
+            target = bundle_dir()
+            try:
+                with open(os.path.join(target, "manifest.json")) as f:
+                    manifest = json.load(f)
+                missing = []
+                for key in manifest["segments"]:
+                    try:
+                        with open(os.path.join(target, key + ".mp3"), "rb") as f:
+                            audio[key] = f.read()
+                    except OSError:
+                        missing.append(key)
+                missing += [key for key in missing_segments(target) if key not in manifest["segments"]]
+                if missing:
+                    print(f"Starter audio bundle is missing {len(missing)} segments ({', '.join(missing)}); they will use TTS")
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Starter audio bundle not available ({e}); starter replies will use TTS")
+            _bundle = audio
+        return _bundle
+
+
+def get_starter_audio(speech_text, voice_name):
+    return load_starter_bundle().get(segment_key(voice_name, speech_text))
+
+
+def get_starter_audio_by_key(key):
+    return load_starter_bundle().get(key)
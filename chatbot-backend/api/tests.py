@@ -1,3 +1,573 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import tempfile
+import threading
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import UserProfile, ChatSession, ChatMessage, Mission, UserMission, Achievement, UserAchievement
+from .gamification import record_activity
+from .achievements import unlock_achievements
+from .missions import MESSAGE_SENT, STREAK_CHANGED, dispatch, mission_table, provision_mission, sync_missions
+from .segmenter import SentenceSegmenter
+from .tts_cache import TTSCache
+from .context_builder import store_summary
+from .export import export_records
+from .history_cache import append_message, history_key, load_history
+from .views_openai import prepare_turn, finish_turn
+
+
+class SentenceSegmenterTests(SimpleTestCase):
+    def split(self, text, deltas=False):
+        segmenter = SentenceSegmenter()
+        # One character at a time, like the worst-case LLM stream
+        sentences = [s for ch in text for s in segmenter.feed(ch)] if deltas else segmenter.feed(text)
+        tail = segmenter.flush()
+        return [s.strip() for s in sentences + [tail] if s.strip()]
+
+    def test_sentence_ends(self):
+        text = "Hello there! How are you? I'm fine. ¿Y tú? ¡Genial!"
+        expected = ["Hello there!", "How are you?", "I'm fine.", "¿Y tú?", "¡Genial!"]
+        self.assertEqual(self.split(text), expected)
+        self.assertEqual(self.split(text, deltas=True), expected)
+
+    def test_decimals(self):
+        self.assertEqual(self.split("It costs 3.50 euros. Pi is 3.14."), ["It costs 3.50 euros.", "Pi is 3.14."])
+
+    def test_abbreviations(self):
+        self.assertEqual(
+            self.split("Mr. Smith met Dr. J. Watson. La Sra. López vive en EE.UU. desde 2010."),
+            ["Mr. Smith met Dr. J. Watson.", "La Sra. López vive en EE.UU. desde 2010."],
+        )
+        self.assertEqual(self.split("1. Open the book. 2. Read it."), ["1. Open the book.", "2. Read it."])
+
+    def test_abbreviations_that_are_words(self):
+        self.assertEqual(self.split("I saw it two days ago. Now it's gone."), ["I saw it two days ago.", "Now it's gone."])
+        self.assertEqual(self.split("Me gusta el mar. ¿Y a ti?", deltas=True), ["Me gusta el mar.", "¿Y a ti?"])
+        # Still abbreviations before a number or a lowercase word
+        self.assertEqual(self.split("Llegó el 5 de ago. de 2024. Fue en mar. 3 o 4."), ["Llegó el 5 de ago. de 2024.", "Fue en mar. 3 o 4."])
+
+    def test_ellipsis(self):
+        self.assertEqual(self.split("Well... I think so. Hmm..."), ["Well...", "I think so.", "Hmm..."])
+
+    def test_parentheses(self):
+        self.assertEqual(
+            self.split("¿Qué tal? (How are you? Fine.) Muy bien."),
+            ["¿Qué tal?", "(How are you? Fine.) Muy bien."],
+        )
+
+    def test_unbalanced_parenthesis(self):
+        # A stray "(" stops at the paragraph end instead of disabling splitting for good
+        self.assertEqual(
+            self.split("Try this (it helps.\nFirst sentence. Second sentence."),
+            ["Try this (it helps.\nFirst sentence.", "Second sentence."],
+        )
+        long_aside = "(" + "word " * 60
+        self.assertEqual(self.split(long_aside + "End. Next one."), [long_aside + "End.", "Next one."])
+
+
+class TTSDiskCacheTests(SimpleTestCase):
+    def disk_usage(self, directory):
+        return sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, names in os.walk(directory) for name in names if name.endswith(".bin")
+        )
+
+    def test_disk_cap_is_shared_by_processes(self):
+        # Two instances on one directory stand in for two workers
+        with tempfile.TemporaryDirectory() as directory:
+            workers = [TTSCache(directory, memory_max_bytes=0, disk_max_bytes=10_000) for _ in range(2)]
+            for i in range(40):
+                workers[i % 2].set(f"{i:064x}", b"x" * 500)
+                self.assertLessEqual(self.disk_usage(directory), 10_000)
+            self.assertGreater(self.disk_usage(directory), 0)
+
+
+class HistoryExportTests(TestCase):
+    MESSAGES = 50
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='exporter', password='x')
+        chat_session = ChatSession.objects.create(user=self.user, title="Long")
+        ChatMessage.objects.bulk_create([
+            ChatMessage(session=chat_session, role='user', content=f"Message {i}") for i in range(self.MESSAGES)
+        ])
+        self.headers = {'Authorization': f"Bearer {RefreshToken.for_user(self.user).access_token}"}
+
+    @mock.patch('api.export.FLUSH_BYTES', 100)
+    async def test_streams_under_asgi(self):
+        pulled = []
+
+        def records(user, using):
+            for record in export_records(user, using=using):
+                pulled.append(record)
+                yield record
+
+        with mock.patch('api.views_chat.export_records', records):
+            response = await self.async_client.get('/api/export/', headers=self.headers)
+            self.assertTrue(response.is_async)
+            first = await anext(response.streaming_content)
+            # Sent before the rest of the history was read
+            self.assertLess(len(pulled), self.MESSAGES)
+            rest = [chunk async for chunk in response.streaming_content]
+
+        lines = (first + b"".join(rest)).decode().splitlines()
+        self.assertEqual(len(lines), self.MESSAGES + 1)  # the session, then its messages
+
+
+class HistoryCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(username='historian', password='x')
+        self.chat_session = ChatSession.objects.create(user=user, title="History")
+        self.first = ChatMessage.objects.create(session=self.chat_session, role='user', content="One")
+
+    def message(self, pk, content):
+        return ChatMessage(id=pk, session=self.chat_session, role='assistant', content=content)
+
+    def test_append(self):
+        load_history(self.chat_session.id)
+        append_message(self.message(self.first.id + 1, "Two"))
+        self.assertEqual([m['content'] for m in load_history(self.chat_session.id)], ["One", "Two"])
+
+    def test_out_of_order_append_drops_the_entry(self):
+        load_history(self.chat_session.id)
+        append_message(self.message(self.first.id + 2, "Three"))
+        # Committed after a newer row: appending would misorder it, so the next load rebuilds
+        append_message(self.message(self.first.id + 1, "Two"))
+        self.assertIsNone(cache.get(history_key(self.chat_session.id)))
+
+    @mock.patch('api.history_cache.APPEND_LOCK_WAIT', 0)
+    def test_concurrent_append_drops_the_entry(self):
+        load_history(self.chat_session.id)
+        cache.add(f"{history_key(self.chat_session.id)}:lock", True)  # another append in progress
+        append_message(self.message(self.first.id + 1, "Two"))
+        self.assertIsNone(cache.get(history_key(self.chat_session.id)))
+
+
+@skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN output is SQLite-specific")
+class HotQueryIndexTests(TestCase):
+    """The hot query shapes must be served by their composite indexes, not a scan + sort."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='plan', password='x')
+        session = ChatSession.objects.create(user=cls.user)
+        ChatMessage.objects.create(session=session, role='user', content='hi')
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(f"INDEX {index_name}", plan)
+        self.assertNotIn("USE TEMP B-TREE FOR ORDER BY", plan)
+        for line in plan.splitlines():
+            # Every table access is an index search, never a full scan
+            self.assertNotRegex(line, r"SCAN api_\w+$")
+
+    def test_session_messages_by_created_at(self):
+        session = ChatSession.objects.get(user=self.user)
+        self.assertUsesIndex(
+            ChatMessage.objects.filter(session_id=session.id).order_by('created_at', 'id'),
+            'chatmsg_session_created_idx',
+        )
+
+    def test_user_sessions_by_updated_at(self):
+        self.assertUsesIndex(
+            ChatSession.objects.filter(user=self.user).order_by('-updated_at', '-id'),
+            'chatsession_user_updated_idx',
+        )
+
+    def test_open_user_missions(self):
+        self.assertUsesIndex(
+            UserMission.objects.filter(user=self.user, completed=False),
+            'usermission_user_open_idx',
+        )
+
+    def test_user_message_count(self):
+        # Same plan as the .count() in check_missions
+        self.assertUsesIndex(
+            ChatMessage.objects.filter(session__user=self.user, role='user').values('pk'),
+            'chatmsg_session_role_idx',
+        )
+
+
+class TurnPersistenceTests(TransactionTestCase):
+    """
+    A chat turn makes a fixed number of writes, each side in one transaction.
+    Real commits: the history cache is appended on commit, before the prompt is built.
+    """
+
+    PRONUNCIATION = {
+        'accuracy_score': 80, 'fluency_score': 70, 'completeness_score': 90,
+        'pronunciation_score': 78, 'mispronounced_words': [],
+    }
+    # api.gamification.take_write_lock's no-op UPDATE
+    WRITE_LOCK = ['UPDATE'] if connection.vendor == 'sqlite' else []
+
+    def setUp(self):
+        cache.clear()  # history cache is keyed by session id, which tests reuse
+        self.user = User.objects.create_user(username='turns', password='x')
+
+    def run_turn(self, data, message="Hello there"):
+        with CaptureQueriesContext(connection) as queries:
+            chat_session, messages, _, _ = prepare_turn(self.user, data, message, None)
+        return chat_session, messages, queries
+
+    def writes(self, queries):
+        return [q['sql'].split()[0] for q in queries.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))]
+
+    def transactions(self, queries):
+        return sum(q['sql'] == 'BEGIN' for q in queries.captured_queries)
+
+    def test_new_session_turn(self):
+        chat_session, messages, queries = self.run_turn({'sessionId': 'new', 'persona': 'friendly'})
+
+        # (SQLite write lock), profile progress, session INSERT (with metadata), user message
+        self.assertEqual(self.writes(queries), [*self.WRITE_LOCK, 'UPDATE', 'INSERT', 'INSERT'])
+        self.assertEqual(self.transactions(queries), 1)
+        self.assertEqual(chat_session.metadata, {'persona': 'friendly'})
+        self.assertEqual(messages[-1], {'role': 'user', 'content': 'Hello there'})
+
+    def test_existing_session_turn(self):
+        chat_session, _, _ = self.run_turn({'sessionId': 'new'})
+        chat_session.metadata['pronunciation_feedback'] = "Fluency: 70"
+        chat_session.save()
+
+        data = {'sessionId': str(chat_session.id), 'persona': 'strict'}
+        # BEGIN, (SQLite write lock), session SELECT, profile SAVEPOINT + SELECT + UPDATE
+        # + RELEASE, session UPDATE, message INSERT, COMMIT; the history comes from the cache
+        with self.assertNumQueries(9 + len(self.WRITE_LOCK)):
+            chat_session, messages, queries = self.run_turn(data, "Second message")
+
+        self.assertEqual(self.writes(queries), [*self.WRITE_LOCK, 'UPDATE', 'UPDATE', 'INSERT'])
+        chat_session.refresh_from_db()
+        self.assertEqual(chat_session.metadata, {'persona': 'strict'})
+        self.assertIn("Fluency: 70", messages[0]['content'])
+        self.assertEqual([m['content'] for m in messages[1:]], ["Hello there", "Second message"])
+
+    def test_finish_turn(self):
+        chat_session, _, _ = self.run_turn({'sessionId': 'new'})
+
+        with CaptureQueriesContext(connection) as queries:
+            finish_turn(self.user, chat_session, "Hi! How are you?", None)
+        # assistant message, assistant_message_count
+        self.assertEqual(self.writes(queries), ['INSERT', 'UPDATE'])
+
+        # Stored while the reply streamed: chat_session still has the metadata from turn start
+        store_summary(chat_session.id, "Earlier talk", 1)
+        with CaptureQueriesContext(connection) as queries:
+            finish_turn(self.user, chat_session, "Good job.", self.PRONUNCIATION)
+        # + fluency score, feedback in the session metadata
+        self.assertEqual(self.writes(queries), ['INSERT', 'UPDATE', 'UPDATE', 'UPDATE'])
+        self.assertEqual(self.transactions(queries), 1)
+        chat_session.refresh_from_db()
+        self.assertIn('pronunciation_feedback', chat_session.metadata)
+        self.assertEqual(chat_session.metadata['summary'], "Earlier talk")
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual(profile.fluency_score, 70)
+        self.assertEqual(profile.assistant_message_count, 2)
+
+    def test_progress_error_keeps_the_turn(self):
+        with mock.patch('api.gamification.dispatch', side_effect=RuntimeError("missions down")), \
+                self.assertLogs('api.views_openai', 'ERROR'):
+            chat_session, _, _ = self.run_turn({'sessionId': 'new'})
+
+        # The progress update rolled back to its savepoint; the turn was written
+        self.assertEqual(ChatMessage.objects.filter(session=chat_session, role='user').count(), 1)
+        self.assertEqual(UserProfile.objects.get(user=self.user).xp, 0)
+
+    def test_activity_counters(self):
+        chat_session, _, _ = self.run_turn({'sessionId': 'new'})
+        prepare_turn(self.user, {'sessionId': str(chat_session.id)}, "Again", None, is_voice=True)
+
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual(
+            (profile.user_message_count, profile.voice_turn_count, profile.session_count),
+            (2, 1, 1),
+        )
+
+
+@mock.patch('api.achievements.run_in_background', lambda fn, *args: fn(*args))
+@override_settings(TTS_CACHE_ENABLED=False)
+@mock.patch('api.views_openai.get_or_synthesize_async', mock.AsyncMock(return_value=b"mp3"))
+class ChatStreamTests(TransactionTestCase):
+    """ChatView through the sync test client: WSGI consumes the stream on its own event loop."""
+
+    ASSESSMENT = TurnPersistenceTests.PRONUNCIATION
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='talker', password='x')
+        self.auth = {'HTTP_AUTHORIZATION': f"Bearer {RefreshToken.for_user(self.user).access_token}"}
+
+    async def reply(self, messages):
+        async def chunks():
+            for word in "Hello there, nice to meet you today. How are you doing this fine morning?".split():
+                await asyncio.sleep(0)
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word + " "))])
+        return chunks()
+
+    async def assess(self, audio_file, reference_text, language='en'):
+        await asyncio.sleep(0.01)
+        return self.ASSESSMENT
+
+    def events(self, response):
+        self.assertEqual(response.status_code, 200)
+        # Iterated like WSGIHandler does: the async stream runs on a new event loop
+        body = b"".join(response).decode()
+        return [json.loads(e[6:]) if e[6:].startswith('{') else e for e in body.split("\n\n") if e]
+
+    def test_voice_turn(self):
+        with mock.patch('api.views_openai.transcribe_audio_async', mock.AsyncMock(return_value=("Hi there", "en"))), \
+                mock.patch('api.views_openai.pronunciation_assessment_async', self.assess), \
+                mock.patch('api.views_openai.get_chat_response_async', self.reply):
+            response = self.client.post('/api/chat/', {'audio': SimpleUploadedFile('turn.webm', b"webm")}, **self.auth)
+            events = self.events(response)
+
+        types = [e['type'] if isinstance(e, dict) else e for e in events]
+        self.assertEqual(types[:2], ['session_id', 'transcription'])
+        self.assertIn('pronunciation_data', types)
+        self.assertIn('response_segment', types)
+        self.assertEqual(types[-1], 'data: [DONE]')
+        chat_session = ChatSession.objects.get(id=events[0]['id'])
+        self.assertIn('pronunciation_feedback', chat_session.metadata)
+        self.assertEqual(UserProfile.objects.get(user=self.user).fluency_score, 70)
+
+    def test_llm_unavailable(self):
+        with mock.patch('api.views_openai.get_chat_response_async', mock.AsyncMock(return_value=None)):
+            events = self.events(self.client.post('/api/chat/', {'message': "Hello"}, **self.auth))
+        self.assertEqual(events[-1]['type'], 'error')
+
+
+class MissionEngineTests(TransactionTestCase):
+    """api.missions: real commits, so provisioning and table refreshes run on_commit."""
+
+    def setUp(self):
+        cache.clear()
+        self.mission = Mission.objects.create(
+            title="Chatty", description="", xp_reward=50, condition_type='message_count', condition_value=2,
+        )
+        self.user = User.objects.create_user(username='achiever', password='x')
+
+    def user_mission(self, mission=None):
+        return UserMission.objects.get(user=self.user, mission=mission or self.mission)
+
+    def test_completed_once_when_crossed(self):
+        record_activity(self.user, xp=10, counters=['user_message_count'])
+        self.assertFalse(self.user_mission().completed)
+
+        record_activity(self.user, xp=10, counters=['user_message_count'])
+        completed_at = self.user_mission().completed_at
+        self.assertIsNotNone(completed_at)
+        self.assertEqual(UserProfile.objects.get(user=self.user).xp, 20 + 50)
+
+        record_activity(self.user, xp=10, counters=['user_message_count'])
+        self.assertEqual(self.user_mission().completed_at, completed_at)
+        self.assertEqual(UserProfile.objects.get(user=self.user).xp, 30 + 50)
+
+    def test_streak_reset_completes_nothing(self):
+        streak_mission = Mission.objects.create(
+            title="Back", description="", xp_reward=20, condition_type='login_streak', condition_value=1,
+        )
+        self.assertEqual(dispatch(self.user, STREAK_CHANGED, 5, 1), 0)
+        self.assertFalse(self.user_mission(streak_mission).completed)
+
+    @mock.patch('api.missions.provision_mission')
+    def test_sync_catches_up_missions_added_later(self, provision_mission):
+        UserProfile.objects.filter(user=self.user).update(user_message_count=10)
+        # Added after the user passed it; provisioning (patched out) would complete it itself
+        later = Mission.objects.create(
+            title="Later", description="", xp_reward=30, condition_type='message_count', condition_value=5,
+        )
+        UserMission.objects.create(user=self.user, mission=later)
+
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual(sync_missions(self.user, profile), 50 + 30)
+        self.assertTrue(self.user_mission(later).completed)
+        self.assertEqual(self.user_mission(later).progress, 10)
+        self.assertEqual(sync_missions(self.user, profile), 0)
+
+    def test_event_crossing_nothing_is_free(self):
+        mission_table()  # cached
+        with self.assertNumQueries(0):
+            self.assertEqual(dispatch(self.user, MESSAGE_SENT, 0, 1), 0)
+
+
+@mock.patch('api.achievements.run_in_background', lambda fn, *args: None)  # unlocks are called directly
+class ProgressCacheTests(TransactionTestCase):
+    """GET /api/progress/ is served from the cache until something the payload shows changes."""
+
+    def setUp(self):
+        cache.clear()
+        self.mission = Mission.objects.create(
+            title="Chatty", description="", xp_reward=50, condition_type='message_count', condition_value=3,
+        )
+        self.achievement = Achievement.objects.create(
+            title="Rising", description="", icon_name="star", condition_type='xp', condition_value=100,
+        )
+        self.user = User.objects.create_user(username='progress', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.first = self.get()
+
+    def get(self, **headers):
+        response = self.client.get('/api/progress/', headers=headers)
+        self.assertIn(response.status_code, (200, 304))
+        return response
+
+    def assertInvalidated(self):
+        response = self.get()
+        self.assertNotEqual(response['ETag'], self.first['ETag'])
+        return response.data
+
+    def test_repeat_get_is_free(self):
+        with self.assertNumQueries(0):
+            response = self.get()
+        self.assertEqual(response.data, self.first.data)
+        self.assertEqual(response['ETag'], self.first['ETag'])
+
+    def test_if_none_match(self):
+        with self.assertNumQueries(0):
+            response = self.get(**{'If-None-Match': self.first['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_chat_turn_invalidates(self):
+        prepare_turn(self.user, {'sessionId': 'new'}, "Hello", None)
+        self.assertEqual(self.assertInvalidated()['xp'], 10)
+
+    def test_progress_post_invalidates(self):
+        self.assertEqual(self.client.post('/api/progress/', {'xp': 5}).status_code, 200)
+        self.assertEqual(self.assertInvalidated()['xp'], 5)
+
+    def test_mission_completion_invalidates(self):
+        # Stat raised without going through the engine: the cached payload stays
+        UserProfile.objects.filter(user=self.user).update(user_message_count=3)
+        self.assertEqual(self.get()['ETag'], self.first['ETag'])
+
+        provision_mission(self.mission)
+        self.assertTrue(self.assertInvalidated()['missions'][0]['completed'])
+
+    def test_achievement_unlock_invalidates(self):
+        unlock_achievements(self.user.id, [self.achievement.id])
+        self.assertEqual(len(self.assertInvalidated()['achievements']), 1)
+
+
+@mock.patch('api.achievements.run_in_background', lambda fn, *args: fn(*args))
+class AchievementUnlockTests(TransactionTestCase):
+    """Unlocks run inline here instead of on the achievements thread pool."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='achiever', password='x')
+        self.first_words = Achievement.objects.create(
+            title="First words", description="", icon_name="chat", condition_type='message_count', condition_value=2,
+        )
+
+    def unlocked(self):
+        return list(UserAchievement.objects.filter(user=self.user).values_list('achievement__title', flat=True))
+
+    def test_unlocked_when_a_turn_crosses_the_threshold(self):
+        record_activity(self.user, counters=['user_message_count'])
+        self.assertEqual(self.unlocked(), [])
+
+        record_activity(self.user, counters=['user_message_count'])
+        self.assertEqual(self.unlocked(), ["First words"])
+
+        record_activity(self.user, counters=['user_message_count'])
+        self.assertEqual(self.unlocked(), ["First words"])
+
+    def test_new_achievement_unlocks_for_users_past_it(self):
+        UserProfile.objects.filter(user=self.user).update(xp=250)
+        Achievement.objects.create(title="Rising", description="", icon_name="star", condition_type='xp', condition_value=200)
+        Achievement.objects.create(title="Expert", description="", icon_name="star", condition_type='xp', condition_value=1000)
+        self.assertEqual(self.unlocked(), ["Rising"])
+
+
+class ConcurrentProgressTests(TransactionTestCase):
+    """Concurrent turns of one user, in one session: every turn and increment lands."""
+
+    THREADS = 8
+    TURNS = 25
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='busy', password='x')
+
+    def test_no_lost_updates(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest("Needs a file or server database for concurrent connections")
+        chat_session, _, _, _ = prepare_turn(self.user, {'sessionId': 'new'}, "First", None)
+
+        def turns():
+            try:
+                for _ in range(self.TURNS):
+                    prepare_turn(self.user, {'sessionId': str(chat_session.id)}, "Again", None)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=turns) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        total = self.THREADS * self.TURNS + 1
+        self.assertEqual(ChatMessage.objects.filter(session=chat_session).count(), total)
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual(profile.xp, total * 10)
+        self.assertEqual(profile.total_time_minutes, total * 0.5)
+        self.assertEqual((profile.user_message_count, profile.session_count), (total, 1))
+        # Computed from the updated XP, not a stale read
+        self.assertEqual(profile.level, 1 + profile.xp // 100)
+        self.assertEqual(profile.streak, 1)
+
+
+@skipUnless('replica' in settings.DATABASES, "Needs REPLICA_DATABASE_URL, e.g. sqlite:///replica.sqlite3")
+@override_settings(ALLOWED_HOSTS=['*'])
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Two separate test databases with no replication between them, so a row
+    only written to `default` shows which alias a request read from.
+    """
+    # Declared only when configured: the runner sets up every alias a test class names
+    databases = {'default', 'replica'} if 'replica' in settings.DATABASES else {'default'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', password='x')
+        # The replica knows the user (authentication) but not their sessions yet
+        User.objects.using('replica').bulk_create([User(id=self.user.id, username='reader')])  # no profile signal
+        ChatSession.objects.create(user=self.user, title="Only on primary")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def titles(self):
+        response = self.client.get('/api/sessions/')
+        self.assertEqual(response.status_code, 200)
+        return [s['title'] for s in response.data['results']]
+
+    def test_safe_reads_use_replica(self):
+        self.assertEqual(self.titles(), [])
+
+    def test_reads_stick_to_primary_after_a_write(self):
+        response = self.client.post('/api/sessions/', {'title': "New"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.titles(), ["New", "Only on primary"])
+
+        cache.clear()  # stickiness window over
+        self.assertEqual(self.titles(), [])
+
+    def test_chat_turn_makes_reads_sticky(self):
+        prepare_turn(self.user, {'sessionId': 'new'}, "Hello", None)
+        self.assertEqual(len(self.titles()), 2)
@@ -0,0 +1,29 @@
+"""
+Cached lookup tables for rules of the form "condition_type reaches
+condition_value" (missions, achievements): rows grouped by condition type and
+sorted by threshold, so the rules a stat change crosses are a bisect away.
+"""
+from bisect import bisect_right
+
+from django.core.cache import cache
+
+TABLE_TTL = 60 * 60
+
+
+def threshold_table(key, queryset):
+    """{condition_type: (thresholds, rows)} from a .values() queryset, cached under `key`."""
+    table = cache.get(key)
+    if table is None:
+        table = {}
+        for row in queryset.order_by('condition_type', 'condition_value', 'id'):
+            thresholds, rows = table.setdefault(row['condition_type'], ([], []))
+            thresholds.append(row['condition_value'])
+            rows.append(row)
+        cache.set(key, table, TABLE_TTL)
+    return table
+
+
+def crossed(table, condition_type, old, new):
+    """Rows of that type with old < condition_value <= new."""
+    thresholds, rows = table.get(condition_type, ([], []))
+    return rows[bisect_right(thresholds, old):bisect_right(thresholds, new)]
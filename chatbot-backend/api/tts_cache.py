@@ -0,0 +1,218 @@
+import hashlib
+import os
+import tempfile
+import threading
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: the size lock only covers this process
+    fcntl = None
+
+from django.conf import settings
+
+from . import azure_services
+from .azure_services import TTS_OUTPUT_FORMAT, run_in_azure_executor
+
+# Holds the disk tier's size in bytes, shared by every process using the directory
+SIZE_FILE = ".size"
+
+
+def speech_cache_key(text, voice_name, output_format=TTS_OUTPUT_FORMAT):
+    """sha256 of (normalized text, voice, output format)"""
+    normalized = " ".join(unicodedata.normalize("NFC", text).split())
+    raw = "\x1f".join([normalized, voice_name, output_format])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """
+    Synthesized audio cache, content-addressed by speech_cache_key().
+    - memory: LRU bounded by total bytes (per process)
+    - disk: one file per key under `disk_dir`, shared by every process;
+      when it grows past `disk_max_bytes` the least recently used files go.
+      Its size is kept in SIZE_FILE under an exclusive lock, so the cap holds
+      for all workers together, not for each one
+    """
+
+    def __init__(self, disk_dir, memory_max_bytes, disk_max_bytes, enabled=True):
+        self.disk_dir = disk_dir
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self.enabled = enabled
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, key[:2], key + ".bin")
+
+    def _remember(self, key, data):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return
+            self._memory[key] = data
+            self._memory_bytes += len(data)
+            while self._memory_bytes > self.memory_max_bytes and self._memory:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def peek_memory(self, key):
+        """Memory tier only; cheap enough to call from the event loop"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+            return data
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return data
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # mtime = last use, for disk eviction
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.disk_hits += 1
+        self._remember(key, data)
+        return data
+
+    def set(self, key, data):
+        if not self.enabled or not data:
+            return
+        self._remember(key, data)
+
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write + rename so other processes never read a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"TTS cache write failed: {e}")
+            return
+
+        try:
+            with self._disk_size() as f:
+                f.seek(0)
+                try:
+                    total = int(f.read()) + len(data)
+                except ValueError:
+                    total = None  # no size yet (first write, or the file was lost)
+                if total is None or total > self.disk_max_bytes:
+                    total = self._evict_disk()
+                f.seek(0)
+                f.truncate()
+                f.write(str(total))
+        except OSError as e:
+            print(f"TTS cache size update failed: {e}")
+
+    @contextmanager
+    def _disk_size(self):
+        """SIZE_FILE, locked against the other threads and processes until the block ends"""
+        with self._disk_lock, open(os.path.join(self.disk_dir, SIZE_FILE), "a+") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)  # released when the file is closed
+            yield f
+
+    def _evict_disk(self):
+        """
+        Deletes least recently used files until the disk tier is under 90% of
+        the cap; returns the size left. Called holding _disk_size().
+        """
+        files = []
+        for root, _, names in os.walk(self.disk_dir):
+            for name in names:
+                if not name.endswith(".bin"):
+                    continue  # SIZE_FILE, writes in progress
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        if total > self.disk_max_bytes:
+            target = self.disk_max_bytes * 0.9
+            for _, size, path in sorted(files):
+                if total <= target:
+                    break
+                try:
+                    os.unlink(path)
+                    total -= size
+                except OSError:
+                    pass
+        return total
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_items": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+            }
+
+
+tts_cache = TTSCache(
+    disk_dir=settings.TTS_CACHE_DIR,
+    memory_max_bytes=settings.TTS_CACHE_MEMORY_MAX_BYTES,
+    disk_max_bytes=settings.TTS_CACHE_DISK_MAX_BYTES,
+    enabled=settings.TTS_CACHE_ENABLED,
+)
+
+
+def get_or_synthesize(text, voice_name, output_format=TTS_OUTPUT_FORMAT):
+    """Cached audio for `text`, calling Azure only on a miss (blocking)"""
+    key = speech_cache_key(text, voice_name, output_format)
+    audio = tts_cache.get(key)
+    if audio is None:
+        audio = azure_services.generate_speech(text, voice_name=voice_name, output_format=output_format)
+        if audio:
+            tts_cache.set(key, audio)
+    return audio
+
+
+async def get_or_synthesize_async(text, voice_name, output_format=TTS_OUTPUT_FORMAT):
+    """Memory hits return right away; disk and Azure run in the Azure executor"""
+    audio = tts_cache.peek_memory(speech_cache_key(text, voice_name, output_format))
+    if audio is None:
+        audio = await run_in_azure_executor(get_or_synthesize, text, voice_name, output_format)
+    return audio
+
+
+async def get_cached_audio_async(key):
+    """Audio already synthesized under `key` (memory, then disk), or None"""
+    audio = tts_cache.peek_memory(key)
+    if audio is None:
+        audio = await run_in_azure_executor(tts_cache.get, key)
+    return audio
@@ -1,8 +1,8 @@
-from django.urls import path
+from django.urls import path, re_path
 from .views import RegisterView
-from .views_openai import ChatView
+from .views_openai import ChatView, SpeechAudioView
 from .views_gamification import ProgressView
-from .views_chat import SessionListView, SessionDetailView, MessageListView
+from .views_chat import SessionListView, SessionDetailView, MessageListView, MessageSearchView, HistoryExportView
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView # Kept for potential future use or if LoginView is not a direct replacement
 
 urlpatterns = [
@@ -10,10 +10,13 @@ urlpatterns = [
     path('login/', TokenObtainPairView.as_view(), name='login'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('chat/', ChatView.as_view(), name='chat'),
+    re_path(r'^tts/(?P<audio_id>[0-9a-f]{64})/$', SpeechAudioView.as_view(), name='tts-audio'),
     path('progress/', ProgressView.as_view(), name='progress'),
     
     # Chat Persistence
     path('sessions/', SessionListView.as_view(), name='session-list'),
     path('sessions/<int:pk>/', SessionDetailView.as_view(), name='session-detail'),
     path('sessions/<int:session_id>/messages/', MessageListView.as_view(), name='message-list'),
+    path('search/', MessageSearchView.as_view(), name='message-search'),
+    path('export/', HistoryExportView.as_view(), name='history-export'),
 ]
\ No newline at end of file
@@ -1,30 +1,150 @@
+from django.core.handlers.asgi import ASGIRequest
+from django.db import router
+from django.db.models import Count, F, OuterRef, Subquery
+from django.http import StreamingHttpResponse
+from django.db.models.functions import Coalesce, Substr
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
-from .models import ChatSession, ChatMessage
-from .serializers import ChatSessionSerializer, ChatMessageSerializer
+from core.db_router import ReplicaReadMixin
+from .models import UserProfile, ChatSession, ChatMessage
+from .archive import rehydrate_session
+from .history_cache import invalidate_history
+from .pagination import MessageKeysetPagination, SessionCursorPagination
+from .export import async_chunks, encode_export, export_records
+from .search import search_messages
+from .serializers import ChatSessionSerializer, ChatSessionSummarySerializer, ChatMessageSerializer, MessageSearchResultSerializer
 
-class SessionListView(generics.ListCreateAPIView):
-    serializer_class = ChatSessionSerializer
+# Last-message preview length for the sidebar
+PREVIEW_CHARS = 80
+
+class SessionListView(ReplicaReadMixin, generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = SessionCursorPagination
+
+    def get_serializer_class(self):
+        # Creating returns the full session; listing only the summaries
+        if self.request.method == 'GET':
+            return ChatSessionSummarySerializer
+        return ChatSessionSerializer
 
     def get_queryset(self):
-        return ChatSession.objects.filter(user=self.request.user).order_by('-updated_at')
+        session_messages = ChatMessage.objects.filter(session=OuterRef('pk')).order_by()
+        return (
+            ChatSession.objects.filter(user=self.request.user)
+            .only('id', 'title', 'created_at', 'updated_at')
+            .annotate(
+                # Archived sessions have no rows here: fall back to the archive's numbers
+                message_count=Coalesce(
+                    Subquery(session_messages.values('session').annotate(c=Count('id')).values('c')),
+                    'archive__message_count',
+                    0,
+                ),
+                last_message=Substr(
+                    Coalesce(
+                        Subquery(session_messages.order_by('-created_at', '-id').values('content')[:1]),
+                        'archive__last_message',
+                    ),
+                    1, PREVIEW_CHARS,
+                ),
+            )
+            .order_by('-updated_at')
+        )
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+        UserProfile.objects.filter(user=self.request.user).update(session_count=F('session_count') + 1)
 
-class SessionDetailView(generics.RetrieveUpdateDestroyAPIView):
+class SessionDetailView(ReplicaReadMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ChatSessionSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         return ChatSession.objects.filter(user=self.request.user)
 
-class MessageListView(generics.ListAPIView):
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        rehydrate_session(instance)
+        data = self.get_serializer(instance).data
+        # Latest page of messages; ?before= / ?after= page through the rest
+        paginator = MessageKeysetPagination()
+        page = paginator.paginate_queryset(instance.messages.all(), request, self)
+        data['messages'] = paginator.get_paginated_data(ChatMessageSerializer(page, many=True).data)
+        return Response(data)
+
+    def perform_destroy(self, instance):
+        session_id = instance.id
+        instance.delete()
+        invalidate_history(session_id)
+
+class MessageListView(ReplicaReadMixin, generics.ListAPIView):
     serializer_class = ChatMessageSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = MessageKeysetPagination
 
     def get_queryset(self):
         session_id = self.kwargs['session_id']
         return ChatMessage.objects.filter(session_id=session_id, session__user=self.request.user).order_by('created_at')
+
+    def list(self, request, *args, **kwargs):
+        # Opening an archived session (first page, no cursor) brings its messages back
+        if not (request.query_params.get('before') or request.query_params.get('after')):
+            archived = ChatSession.objects.filter(
+                id=self.kwargs['session_id'], user=request.user, archived_at__isnull=False
+            ).first()
+            if archived:
+                rehydrate_session(archived)
+        return super().list(request, *args, **kwargs)
+
+class MessageSearchView(ReplicaReadMixin, APIView):
+    """
+    GET /api/search/?q=...&page=N — ranked full-text search over the user's
+    messages (api/search.py). Ranked results can't use a keyset, so pages are
+    offsets; one extra row tells whether there's a next page.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    page_size = 20
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"error": "Missing search query (q)"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            page = max(int(request.query_params.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+
+        rows = search_messages(request.user, query, limit=self.page_size + 1, offset=(page - 1) * self.page_size)
+        url = request.build_absolute_uri()
+        return Response({
+            'next': replace_query_param(url, 'page', page + 1) if len(rows) > self.page_size else None,
+            'previous': replace_query_param(url, 'page', page - 1) if page > 1 else None,
+            'results': MessageSearchResultSerializer(rows[:self.page_size], many=True).data,
+        })
+
+class HistoryExportView(ReplicaReadMixin, APIView):
+    """
+    GET /api/export/?format=ndjson|json&gzip=1 — the user's whole history,
+    streamed (api/export.py) so memory stays flat whatever its size. ASGI
+    only streams async iterators, WSGI only sync ones.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        fmt = request.query_params.get('format', 'ndjson')
+        if fmt not in ('ndjson', 'json'):
+            return Response({"error": "format must be ndjson or json"}, status=status.HTTP_400_BAD_REQUEST)
+        compress = request.query_params.get('gzip') in ('1', 'true')
+
+        # The body is produced after this view returns: pin the alias picked now
+        using = router.db_for_read(ChatMessage)
+        chunks = encode_export(export_records(request.user, using=using), fmt=fmt, compress=compress)
+        if isinstance(request._request, ASGIRequest):
+            chunks = async_chunks(chunks)
+
+        filename = f"ailean-history.{fmt}" + (".gz" if compress else "")
+        content_type = 'application/gzip' if compress else ('application/x-ndjson' if fmt == 'ndjson' else 'application/json')
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
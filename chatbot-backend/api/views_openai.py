@@ -1,238 +1,256 @@
-from django.http import StreamingHttpResponse
-from rest_framework.views import APIView
-from rest_framework.response import Response
-from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse, StreamingHttpResponse, JsonResponse, Http404
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework import status
-from .openai_services import transcribe_audio, get_chat_response, generate_speech
-from .azure_services import pronunciation_assessment, format_pronunciation_feedback
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from .openai_services import transcribe_audio_async, get_chat_response_async
+from .azure_services import pronunciation_assessment_async, format_pronunciation_feedback
+from .tts_cache import tts_cache, get_or_synthesize_async, get_cached_audio_async, speech_cache_key
 from .models import UserProfile, ChatSession, ChatMessage
-from django.utils import timezone
-import datetime
+from .personas import PERSONAS, STARTER_RESPONSES
+from .archive import rehydrate_session
+from .gamification import record_activity, record_fluency, take_write_lock
+from .context_builder import build_context, schedule_summary_refresh
+from .segmenter import SentenceSegmenter, clean_text_for_speech, split_starter_response
+from .starter_audio import get_starter_audio, get_starter_audio_by_key, segment_key
+from django.db import transaction
+from core.db_router import mark_recent_write
+from django.db.models import F
+import asyncio
+import logging
 import base64
 import json
-import re
 
-class ChatView(APIView):
-    parser_classes = (MultiPartParser, FormParser, JSONParser)
+logger = logging.getLogger(__name__)
 
-    def post(self, request, *args, **kwargs):
-        user_message = ""
-        audio_file = request.FILES.get('audio')
-        pronunciation_data = None
-        
-        # 1. Handle Input (Text or Audio)
-        if audio_file:
-            # Transcribe audio
-            # Transcribe audio
-            transcription_result = transcribe_audio(audio_file)
-            if not transcription_result:
-                return Response({"error": "Failed to transcribe audio"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            
-            user_message, detected_lang = transcription_result
-            
-            # --- PRONUNCIATION ASSESSMENT ---
-            # Assess pronunciation ONLY if language is English (skip for Spanish)
-            is_spanish = str(detected_lang).lower() in ['es', 'spanish', 'español']
-            
-            if not is_spanish:
-                print(f"Performing pronunciation assessment on: '{user_message}' (Lang: {detected_lang})")
-                pronunciation_data = pronunciation_assessment(audio_file, user_message, language=detected_lang)
-            else:
-                print(f"Skipping pronunciation assessment for Spanish input (Lang: {detected_lang})")
-            
-            if pronunciation_data:
-                print(f"✓ Pronunciation assessment completed")
-            else:
-                print("⚠ Pronunciation assessment not available (Azure not configured or failed)")
-            # --------------------------------
-            
-        else:
-            # Try to get text from form data or json
-            user_message = request.data.get('message')
-            if not user_message:
-                 return Response({"error": "No message or audio provided"}, status=status.HTTP_400_BAD_REQUEST)
+# Segments synthesized ahead of the one being sent, per turn. The Azure thread
+# pool (AZURE_MAX_WORKERS) bounds synthesis across all turns of the process.
+TTS_PIPELINE_DEPTH = 3
 
-        # --- Gamification Logic ---
-        if request.user.is_authenticated:
-            try:
-                profile, created = UserProfile.objects.get_or_create(user=request.user)
-                
-                # Award XP (e.g., 10 XP per message)
-                profile.xp += 10
-                
-                # Update Time (e.g., 0.5 minutes per interaction)
-                profile.total_time_minutes += 0.5
-                
-                # Update Streak
-                now = timezone.now()
-                if profile.last_activity:
-                    last_date = profile.last_activity.date()
-                    today = now.date()
-                    if last_date == today - datetime.timedelta(days=1):
-                        profile.streak += 1
-                    elif last_date < today - datetime.timedelta(days=1):
-                        profile.streak = 1 # Reset streak if missed a day
-                    elif last_date == today:
-                        pass # Already active today
-                else:
-                    profile.streak = 1
-                
-                # Level Up Logic (Simple: 100 XP per level)
-                new_level = 1 + (profile.xp // 100)
-                if new_level > profile.level:
-                    profile.level = new_level
-                    # TODO: Notify frontend of level up via SSE if possible
-                
-                # Update Fluency Score if available from assessment
-                if pronunciation_data:
-                    current_session_score = float(pronunciation_data.get('fluency_score', 0))
-                    
-                    if profile.fluency_score == 0:
-                        # First time: Set directly
-                        profile.fluency_score = int(current_session_score)
-                    else:
-                        # Moving Average: 70% History, 30% New
-                        # This prevents drastic jumps (e.g. from 100 to 26 in one go) and smooths progress
-                        new_score = (float(profile.fluency_score) * 0.7) + (current_session_score * 0.3)
-                        profile.fluency_score = int(new_score)
-                        
-                    # Optional: Use pronunciation/accuracy for other metrics if needed
-                    # profile.vocabulary_score = int(pronunciation_data.get('accuracy_score', 0)) 
-                
-                profile.save()
-            except Exception as e:
-                print(f"Error updating progress: {e}")
-        # --------------------------
 
-        # Generator function for StreamingHttpResponse
-        is_audio = bool(audio_file)
-        
-        def clean_text_for_speech(text):
-            # Remove content in parentheses (e.g., translations)
-            return re.sub(r'\s*\(.*?\)', '', text).strip()
-
-        # 2. Get Response from LLM (Streaming)
-        
-        # 2. Get Response from LLM (Streaming)
-        
-        # --- DEFINITIONS ---
-        personas = {
-            "friendly": {
-                "voice": "en-US-AvaMultilingualNeural", # Multilingual (Fluent En/Es)
-                "system_prompt": """You are a Friendly English Tutor AI.
-Role: You are the teacher. TEACH directly. Do NOT recommend external apps/websites.
-Goal: Help students improve English in a warm, supportive way.
-Style: Cheerful, patient, and easy to understand.
-Interact: Encourage the student often. Do NOT use emojis.
-Language: If student speaks Spanish, reply in Spanish but gently guide to English.
-Conciseness: Keep responses SHORT (2-4 sentences).
-Context: If there is existing conversation history, CONTINUE it naturally. Do NOT ignore previous messages.""",
-            },
-            "strict": {
-                "voice": "en-US-AndrewMultilingualNeural", # Multilingual (Fluent En/Es)
-                "system_prompt": """You are a Strict English Professor AI.
-Role: You are the professor. TEACH directly. Do NOT recommend external apps/websites.
-Goal: Ensure grammatical accuracy and formal usage.
-Style: Formal, direct, and serious. Do NOT use emojis.
-Interact: Correct mistakes immediately. Do not tolerate slang unless asked.
-Language: Use high-level English.
-Conciseness: Precise and concise (2-4 sentences).
-Context: If there is existing conversation history, CONTINUE it naturally. Do NOT ignore previous messages.""",
-            },
-            "encouraging": {
-                "voice": "en-US-BrianMultilingualNeural", # Multilingual (Fluent En/Es)
-                "system_prompt": """You are an Encouraging Coach AI.
-Role: You are the coach. TRAIN the student directly. Do NOT recommend external apps/websites.
-Goal: Motivate the student to speak without fear.
-Style: High energy, positive, and motivational. Do NOT use emojis.
-Interact: Celebrate mistakes as learning opportunities. "You got this!"
-Language: Simple, punchy English.
-Conciseness: Short and energetic (2-4 sentences).
-Context: If there is existing conversation history, CONTINUE it naturally. Do NOT ignore previous messages.""",
-            },
-            "chill": {
-                "voice": "en-US-EmmaMultilingualNeural", # Multilingual (Fluent En/Es)
-                "system_prompt": """You are a Chill Study Buddy AI.
-Role: You are a study partner. PRACTICE together. Do NOT recommend external apps/websites.
-Goal: Chat comfortably like a friend.
-Style: Relaxed, uses slang (like 'gonna', 'wanna'), casual. Do NOT use emojis.
-Interact: Cool and laid back.
-Language: Casual English.
-Conciseness: Short and casual (2-4 sentences).
-Context: If there is existing conversation history, CONTINUE it naturally. Do NOT ignore previous messages.""",
-            },
-             "professional": {
-                "voice": "en-US-AndrewMultilingualNeural", # Sharing Andrew (Professional tone)
-                "system_prompt": """You are a Professional English Tutor AI.
-Role: You are the instructor. TEACH directly. Do NOT recommend external apps/websites.
-Goal: Teach English with a focus on professional/business contexts, BUT help students of ALL levels (A1-C2).
-Style: Professional, polite, and efficient. Do NOT use emojis.
-Interact: Explain concepts clearly. If the user is a beginner, use simple professional language. NEVER refuse to help with basic English.
-Language: Business-appropriate English.
-Conciseness: Professional and brief (2-3 sentences).
-Context: If there is existing conversation history, CONTINUE it naturally. Do NOT ignore previous messages.""",
-            }
-        }
-        
-        # Starter Prompts & Responses
-        starter_responses = {
-            "Quiero obtener retroalimentación": {
-                "response": "¡Claro que sí! Estoy listo para ayudarte a mejorar. Por favor, envíame el texto o audio que quieres que revise, o simplemente empieza a hablar y yo te iré corrigiendo.",
-                "mode": "feedback",
-                "system_prompt": "Focus explicitly on giving feedback. Correct grammar and pronunciation errors politely but clearly. Explain WHY it was an error."
-            },
-             "Quiero aprender ingles basico": {
-                "response": "¡Excellent! Empecemos con lo básico. ¿Qué tal si practicamos saludos y presentaciones? Repite después de mí: 'Hello, my name is...'. ¡Inténtalo!",
-                "mode": "basic",
-                "system_prompt": "TEACHING CONTEXT: The user is a BEGINNER (A1). RULE: Provide ALL instructions, feedback, and encouragement IN SPANISH. Only speak English when demonstrating the specific words or phrases the student must learn. Do not carry a conversation in English yet."
-            },
-             "Quiero aprender ingles elemental": {
-                "response": "¡Great choice! Vamos a subir un pequeño escalón. Hablemos de tus rutinas diarias o hobbies. Tell me, what do you usually do in the mornings?",
-                "mode": "elementary",
-                "system_prompt": "TEACHING CONTEXT: The user is ELEMENTARY (A2). RULE: Use primarily SPANISH for complex explanations. Use simple English for questions and basic conversation. Ensure the user understands before moving on."
-            },
-             "Quiero aprender ingles Intermedio": {
-                "response": "Awesome! Let's practice conversing more naturally. We could discuss travel, work, or opinions. What topic interests you today?",
-                "mode": "intermediate",
-                "system_prompt": "TEACHING CONTEXT: The user is INTERMEDIATE (B1/B2). Challenge them with opinions, future plans, and conditionals. Speak at a normal conversational speed."
-            }
-        }
+async def authenticate_jwt(request):
+    """
+    Resolves the user from the Bearer token, same as DRF's JWTAuthentication.
+    Raises AuthenticationFailed on an invalid/expired token.
+    """
+    result = await sync_to_async(JWTAuthentication().authenticate)(request)
+    if result is None:
+        return AnonymousUser()
+    return result[0]
+
+
+def get_request_data(request):
+    """Form data (multipart/urlencoded) or JSON body, like DRF's request.data"""
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except json.JSONDecodeError:
+            return {}
+    return request.POST
+
+
+def response_segment_event(text, audio_content, audio_id=None):
+    """
+    `audio_id` set (binary transport): the event only points to the audio,
+    served as raw MP3 by SpeechAudioView. Otherwise it's inlined as base64.
+    """
+    if audio_id:
+        payload = {'type': 'response_segment', 'text': text, 'audio': None, 'audio_id': audio_id if audio_content else None}
+    else:
+        audio_base64 = base64.b64encode(audio_content).decode('utf-8') if audio_content else None
+        payload = {'type': 'response_segment', 'text': text, 'audio': audio_base64}
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+async def segment_event(text, speech_text, voice_name, binary_audio=False):
+    """Synthesizes one segment and returns its `response_segment` SSE event"""
+    audio_content = None
+    if speech_text:
+        # Cache first (starter replies, greetings, repeated corrections), Azure on a miss
+        audio_content = await get_or_synthesize_async(speech_text, voice_name)
+        if not audio_content:
+            print("⚠ Audio generation failed")
+    audio_id = speech_cache_key(speech_text, voice_name) if binary_audio and speech_text else None
+    return response_segment_event(text, audio_content, audio_id)
+
+
+def wants_binary_audio(data):
+    """
+    `audio_transport=binary` asks for segment audio by id instead of base64
+    inside the SSE events. Needs the TTS cache, which is where it's served from.
+    """
+    return data.get('audio_transport') == 'binary' and tts_cache.enabled
 
-        # Check if user message matches a starter prompt
-        starter_data = starter_responses.get(user_message.strip())
+
+def cancel_pending(tasks):
+    for task in tasks:
+        if isinstance(task, asyncio.Future) and not task.done():
+            task.cancel()
+
+
+def pronunciation_event(pronunciation_data):
+    pronunciation_payload = {
+        'type': 'pronunciation_data',
+        'accuracy': pronunciation_data['accuracy_score'],
+        'fluency': pronunciation_data['fluency_score'],
+        'pronunciation_score': pronunciation_data['pronunciation_score'],
+        'completeness': pronunciation_data['completeness_score'],
+        'mispronounced_words': [
+            {
+                'word': w['word'],
+                'accuracy': w['accuracy'],
+                'error_type': w['error_type']
+            } for w in pronunciation_data['mispronounced_words']
+        ]
+    }
+    return f"data: {json.dumps(pronunciation_payload)}\n\n"
+
+
+async def interleave_assessment(events, assessment_task):
+    """
+    Yields `events` and, as soon as the pronunciation assessment finishes,
+    its `pronunciation_data` event (waiting for it at the end if needed).
+    """
+    if assessment_task is None:
+        async for event in events:
+            yield event
+        return
+
+    events = events.__aiter__()
+    next_event = asyncio.ensure_future(events.__anext__())
+    pending_assessment = assessment_task
+    try:
+        while True:
+            waiters = {next_event, pending_assessment} if pending_assessment else {next_event}
+            done, _ = await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+
+            if pending_assessment in done:
+                pending_assessment = None
+                if assessment_task.result():
+                    yield pronunciation_event(assessment_task.result())
+
+            if next_event in done:
+                try:
+                    event = next_event.result()
+                except StopAsyncIteration:
+                    break
+                yield event
+                next_event = asyncio.ensure_future(events.__anext__())
+
+        if pending_assessment and await pending_assessment:
+            yield pronunciation_event(assessment_task.result())
+    finally:
+        next_event.cancel()
+
+
+def update_progress(user, new_session=False, voice=False):
+    """XP, time, streak, level and activity counters for a user turn (api.gamification)."""
+    counters = ['user_message_count']
+    if new_session:
+        counters.append('session_count')
+    if voice:
+        counters.append('voice_turn_count')
+    try:
+        # 10 XP and 0.5 minutes per interaction
+        record_activity(user, xp=10, minutes=0.5, counters=counters)
+    except Exception:
+        # Rolled back to the savepoint: the turn goes on without progress
+        logger.exception("Error updating progress")
+
+
+def record_pronunciation(user, pronunciation_data):
+    """
+    Updates the fluency score; returns the feedback the next turn's prompt
+    uses (finish_turn stores it in the session).
+    """
+    try:
+        record_fluency(user, float(pronunciation_data.get('fluency_score', 0)))
+        # Optional: Use pronunciation/accuracy for other metrics if needed
+        # profile.vocabulary_score = int(pronunciation_data.get('accuracy_score', 0))
+    except Exception:
+        logger.exception("Error updating fluency score")
+
+    return format_pronunciation_feedback(pronunciation_data)
+
+
+def finish_turn(user, chat_session, reply_text, pronunciation_data):
+    """
+    Runs once the reply has streamed: the assistant message, fluency score and
+    feedback for the next turn, in a single transaction.
+    """
+    with transaction.atomic():
+        # A write comes first, so on SQLite the transaction holds the write lock
+        # before record_pronunciation reads the profile
+        if chat_session and reply_text:
+            ChatMessage.objects.create(session=chat_session, role='assistant', content=reply_text)
+            UserProfile.objects.filter(user=user).update(assistant_message_count=F('assistant_message_count') + 1)
+        elif pronunciation_data and user.is_authenticated:
+            take_write_lock(user)
+
+        if pronunciation_data and user.is_authenticated:
+            feedback = record_pronunciation(user, pronunciation_data)
+            if chat_session:
+                # Re-read under a row lock: the metadata loaded at turn start may predate
+                # a summary stored while the reply streamed (context_builder.store_summary)
+                locked = ChatSession.objects.select_for_update().filter(id=chat_session.id).first()
+                if locked:
+                    locked.metadata['pronunciation_feedback'] = feedback
+                    locked.save(update_fields=['metadata'])
+                    chat_session.metadata = locked.metadata
+
+    if user.is_authenticated:
+        mark_recent_write(user.id)
+
+
+def prepare_turn(user, data, user_message, starter_data, is_voice=False):
+    """
+    Session retrieval, persona config and prompt building (DB work).
+    Progress, the session (created, or one metadata update) and the user
+    message are written in a single transaction.
+    Returns (chat_session, messages, voice_name, summarize_before_id).
+    """
+    with transaction.atomic():
+        if user.is_authenticated:
+            # Before the session is read: concurrent turns queue here on SQLite
+            take_write_lock(user)
 
         # --- SESSION RETRIEVAL ---
         chat_session = None
-        if request.user.is_authenticated:
-            if session_id := request.data.get('sessionId'):
-                if session_id != 'new' and session_id != 'null':
-                    try:
-                        chat_session = ChatSession.objects.get(id=session_id, user=request.user)
-                    except ChatSession.DoesNotExist:
-                        chat_session = ChatSession.objects.create(user=request.user, title=user_message[:30] + "...")
-                else:
-                    chat_session = ChatSession.objects.create(user=request.user, title=user_message[:30] + "...")
-            else:
-                chat_session = ChatSession.objects.create(user=request.user, title=user_message[:30] + "...")
-            
+        if user.is_authenticated:
+            session_id = data.get('sessionId')
+            if session_id and session_id not in ('new', 'null'):
+                # Locked until the metadata is saved below, so a summary stored meanwhile isn't lost
+                chat_session = ChatSession.objects.select_for_update().filter(id=session_id, user=user).first()
+            if chat_session is None:
+                # Not saved yet: created below with its metadata in one INSERT
+                chat_session = ChatSession(user=user, title=user_message[:30] + "...")
+            elif chat_session.archived_at:
+                rehydrate_session(chat_session)
+
+            # --- Gamification Logic ---
+            update_progress(user, new_session=not chat_session.pk, voice=is_voice)
+            # --------------------------
+
         # --- PERSONA CONFIGURATION ---
         persona = "friendly" # Default
-        
+
         # 1. Check request for direct switch
-        if request.data.get('persona'):
-             persona = request.data.get('persona')
+        if data.get('persona'):
+             persona = data.get('persona')
              if chat_session:
                  chat_session.metadata['persona'] = persona
-                 chat_session.save()
         # 2. Check session metadata
         elif chat_session and chat_session.metadata.get('persona'):
              persona = chat_session.metadata.get('persona')
         # 3. If new session and no persona, save default
         elif chat_session:
              chat_session.metadata['persona'] = persona
-             chat_session.save()
 
-        current_persona_config = personas.get(persona, personas["friendly"])
+        current_persona_config = PERSONAS.get(persona, PERSONAS["friendly"])
         base_system_prompt = current_persona_config["system_prompt"]
         voice_name = current_persona_config["voice"]
 
@@ -240,232 +258,288 @@ Context: If there is existing conversation history, CONTINUE it naturally. Do NO
             # Update metadata if starter prompt (mode overrides persona system prompt context later)
             if starter_data:
                 chat_session.metadata['mode'] = starter_data['mode']
+
+            # --- PRONUNCIATION CONTEXT FOR THE SYSTEM PROMPT ---
+            # Assessment runs while the reply streams, so the feedback stored by
+            # the previous voice turn is what this turn gets
+            pronunciation_context = chat_session.metadata.pop('pronunciation_feedback', None)
+
+            # One write for every metadata change (also bumps updated_at for the sidebar)
+            if chat_session.pk:
+                chat_session.save(update_fields=['metadata', 'updated_at'])
+            else:
                 chat_session.save()
 
             # Save User Message
             ChatMessage.objects.create(session=chat_session, role='user', content=user_message)
 
-            
-            # Load history from DB for context
-            db_messages = chat_session.messages.order_by('created_at')
-            
-            # Determine System Prompt
-            current_system_prompt = base_system_prompt # Default from PERSONA
-            
-            # If mode is set (Starter), it overrides Persona prompt
-            # If mode is set (Starter), APPEND it to Persona prompt instead of replacing
-            if chat_session.metadata.get('mode'):
-                for key, val in starter_responses.items():
-                    if val['mode'] == chat_session.metadata.get('mode'):
-                        # MERGE: Keep the persona (Who I am) + Add context (What I'm teaching)
-                        current_system_prompt += f"\n\n--- CURRENT LESSON CONTEXT ---\n{val['system_prompt']}"
-                        break
-            
-            # --- ADD PRONUNCIATION CONTEXT TO SYSTEM PROMPT ---
-            if pronunciation_data:
-                pronunciation_context = format_pronunciation_feedback(pronunciation_data)
-                current_system_prompt += f"\n\n--- PRONUNCIATION ASSESSMENT DATA ---\n{pronunciation_context}\n\nIntegrate relevant pronunciation tips naturally into your response (1-2 sentences max)."
-            # --------------------------------------------------
-            
-            messages = [{"role": "system", "content": current_system_prompt}]
-            for msg in db_messages:
-                messages.append({"role": msg.role, "content": msg.content})
+    # Read-your-writes: the sidebar/history GETs that follow skip the replica
+    if user.is_authenticated:
+        mark_recent_write(user.id)
+
+    if chat_session:
+        # Determine System Prompt
+        current_system_prompt = base_system_prompt # Default from PERSONA
+
+        # If mode is set (Starter), APPEND it to Persona prompt instead of replacing
+        if chat_session.metadata.get('mode'):
+            for key, val in STARTER_RESPONSES.items():
+                if val['mode'] == chat_session.metadata.get('mode'):
+                    # MERGE: Keep the persona (Who I am) + Add context (What I'm teaching)
+                    current_system_prompt += f"\n\n--- CURRENT LESSON CONTEXT ---\n{val['system_prompt']}"
+                    break
+
+        # --- ADD PRONUNCIATION CONTEXT TO SYSTEM PROMPT ---
+        if pronunciation_context:
+            current_system_prompt += f"\n\n--- PRONUNCIATION ASSESSMENT DATA (previous message) ---\n{pronunciation_context}\n\nIntegrate relevant pronunciation tips naturally into your response (1-2 sentences max)."
+        # --------------------------------------------------
+
+        # History from DB for context, trimmed to the token budget
+        messages, summarize_before_id = build_context(chat_session, current_system_prompt)
+    else:
+        # Fallback for unauthenticated (no session to carry pronunciation feedback)
+        summarize_before_id = None
+        current_system_prompt = base_system_prompt
+
+        messages = [{"role": "system", "content": current_system_prompt}]
+        history_str = data.get('history')
+        if history_str:
+            try:
+                history = json.loads(history_str)
+                for msg in history:
+                    if msg.get('role') in ['user', 'assistant', 'bot'] and msg.get('content'):
+                        role = 'assistant' if msg['role'] == 'bot' else msg['role']
+                        messages.append({"role": role, "content": msg['content']})
+            except json.JSONDecodeError:
+                pass
+        messages.append({"role": "user", "content": user_message})
+
+    return chat_session, messages, voice_name, summarize_before_id
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ChatView(View):
+    """
+    Async SSE chat endpoint. Under ASGI (core/asgi.py) every OpenAI/Azure wait
+    yields the event loop, so one process holds many concurrent conversations
+    instead of one per WSGI worker.
+    """
+
+    async def post(self, request, *args, **kwargs):
+        try:
+            request.user = await authenticate_jwt(request)
+        except AuthenticationFailed as e:
+            detail = e.detail if isinstance(e.detail, (list, dict)) else {"detail": e.detail}
+            return JsonResponse(detail, status=status.HTTP_401_UNAUTHORIZED, safe=False)
+
+        data = get_request_data(request)
+        user_message = ""
+        audio_file = request.FILES.get('audio')
+        assess_pronunciation = False
+
+        # 1. Handle Input (Text or Audio)
+        if audio_file:
+            # Transcribe audio
+            transcription_result = await transcribe_audio_async(audio_file)
+            if not transcription_result:
+                return JsonResponse({"error": "Failed to transcribe audio"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+            user_message, detected_lang = transcription_result
+
+            # --- PRONUNCIATION ASSESSMENT ---
+            # Assess pronunciation ONLY if language is English (skip for Spanish).
+            # Runs in the background while the reply streams (started by event_stream);
+            # the result is sent as a late `pronunciation_data` event and feeds the next turn.
+            is_spanish = str(detected_lang).lower() in ['es', 'spanish', 'español']
+
+            if not is_spanish:
+                print(f"Performing pronunciation assessment on: '{user_message}' (Lang: {detected_lang})")
+                assess_pronunciation = True
+            else:
+                print(f"Skipping pronunciation assessment for Spanish input (Lang: {detected_lang})")
+            # --------------------------------
+
         else:
-            # Fallback for unauthenticated
-            current_system_prompt = base_system_prompt 
-            
-            # Add pronunciation context for unauthenticated users too
-            if pronunciation_data:
-                pronunciation_context = format_pronunciation_feedback(pronunciation_data)
-                current_system_prompt += f"\n\n--- PRONUNCIATION ASSESSMENT DATA ---\n{pronunciation_context}\n\nIntegrate relevant pronunciation tips naturally into your response (1-2 sentences max)."
-            
-            messages = [{"role": "system", "content": current_system_prompt}]
-            history_str = request.data.get('history')
-            if history_str:
-                try:
-                    history = json.loads(history_str)
-                    for msg in history:
-                        if msg.get('role') in ['user', 'assistant', 'bot'] and msg.get('content'):
-                            role = 'assistant' if msg['role'] == 'bot' else msg['role']
-                            messages.append({"role": role, "content": msg['content']})
-                except json.JSONDecodeError:
-                    pass
-            messages.append({"role": "user", "content": user_message})
-        # ------------------------------------------
+            # Try to get text from form data or json
+            user_message = data.get('message')
+            if not user_message:
+                 return JsonResponse({"error": "No message or audio provided"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Special handling for Starter Prompts: Stream sentence-by-sentence for speed
-        if starter_data:
-            def starter_stream():
-                if chat_session:
-                     yield f"data: {json.dumps({'type': 'session_id', 'id': chat_session.id})}\n\n"
-                
-                response_text = starter_data['response']
-                
-                # Split text into sentences/segments to stream audio progressively
-                # Split by punctuation (. ! ?) followed by whitespace, keeping the delimiter
-                raw_segments = re.split(r'([.!?\n]+(?:\s+|$))', response_text)
-                
-                chunks = []
-                current_chunk = ""
-                
-                # Reassemble chunks (text + delimiter)
-                # raw_segments result: ["Hola", "!\n", "Como estas", "?", ""]
-                for i in range(0, len(raw_segments) - 1, 2):
-                    chunks.append(raw_segments[i] + raw_segments[i+1])
-                if len(raw_segments) % 2 != 0:
-                    chunks.append(raw_segments[-1])
-                    
-                # Filter empty chunks
-                chunks = [c for c in chunks if c.strip()]
-                
-                for i, chunk in enumerate(chunks):
-                    # Generate audio for the chunk
-                    cleaned_chunk = clean_text_for_speech(chunk)
-                    audio_base64 = None
-                    
-                    if cleaned_chunk:
-                        # USE AZURE TTS
-                        from .azure_services import generate_speech as generate_speech_azure
-                        audio_content = generate_speech_azure(cleaned_chunk, voice_name=voice_name)
-                        
-                        if audio_content:
-                            audio_base64 = base64.b64encode(audio_content).decode('utf-8')
-                        else:
-                             # Don't error out, just send text
-                             pass
-                    
-                    # Send synchronized segment
-                    yield f"data: {json.dumps({'type': 'response_segment', 'text': chunk, 'audio': audio_base64})}\n\n"
+        is_audio = bool(audio_file)
+        binary_audio = wants_binary_audio(data)
 
-                if chat_session:
-                    ChatMessage.objects.create(session=chat_session, role='assistant', content=response_text)
-                
-                yield "data: [DONE]\n\n"
-            
-            return StreamingHttpResponse(starter_stream(), content_type='text/event-stream')
-
-        stream = get_chat_response(messages, stream=True)
-        
-        # Check if stream is actually a generator (success) or a string (error)
-        if isinstance(stream, str) or not hasattr(stream, '__iter__'):
-             # Handle error case where get_chat_response returned a string or non-iterable
-             return Response({"error": "Failed to get response from AI service. Check API Key."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        # Check if user message matches a starter prompt
+        starter_data = STARTER_RESPONSES.get(user_message.strip())
+
+        chat_session, messages, voice_name, summarize_before_id = await sync_to_async(prepare_turn)(
+            request.user, data, user_message, starter_data, is_voice=is_audio
+        )
 
         full_response_text = ""
-        buffer = ""
-        speech_buffer = "" # Accumulate sentences for smoother speech
 
-        def event_stream():
-            nonlocal full_response_text, buffer, speech_buffer
-            
-            # Send session ID to frontend so it can update URL/state
-            if chat_session:
-                 yield f"data: {json.dumps({'type': 'session_id', 'id': chat_session.id})}\n\n"
-
-            if is_audio:
-                yield f"data: {json.dumps({'type': 'transcription', 'text': user_message})}\n\n"
-            
-            # --- SEND PRONUNCIATION DATA TO FRONTEND ---
-            if pronunciation_data:
-                pronunciation_payload = {
-                    'type': 'pronunciation_data',
-                    'accuracy': pronunciation_data['accuracy_score'],
-                    'fluency': pronunciation_data['fluency_score'],
-                    'pronunciation_score': pronunciation_data['pronunciation_score'],
-                    'completeness': pronunciation_data['completeness_score'],
-                    'mispronounced_words': [
-                        {
-                            'word': w['word'],
-                            'accuracy': w['accuracy'],
-                            'error_type': w['error_type']
-                        } for w in pronunciation_data['mispronounced_words']
-                    ]
-                }
-                yield f"data: {json.dumps(pronunciation_payload)}\n\n"
-            # --------------------------------------------
+        # Special handling for Starter Prompts: Stream sentence-by-sentence for speed
+        async def starter_segments():
+            nonlocal full_response_text
+            full_response_text = starter_data['response']
 
+            # Audio comes from the pre-rendered starter bundle; segments
+            # missing from it are synthesized concurrently. Sent in order.
+            segment_tasks = []
+            for chunk in split_starter_response(full_response_text):
+                speech_text = clean_text_for_speech(chunk)
+                audio_content = get_starter_audio(speech_text, voice_name) if speech_text else None
+                if audio_content or not speech_text:
+                    audio_id = segment_key(voice_name, speech_text) if binary_audio and speech_text else None
+                    segment_tasks.append(response_segment_event(chunk, audio_content, audio_id))
+                else:
+                    segment_tasks.append(asyncio.ensure_future(segment_event(chunk, speech_text, voice_name, binary_audio)))
+            try:
+                for task in segment_tasks:
+                    yield task if isinstance(task, str) else await task
+            finally:
+                cancel_pending(segment_tasks)
+
+        async def produce_segments(stream, segments):
+            """
+            Reads the LLM stream and queues one synthesis task per segment
+            without waiting for it, so TTS runs while tokens keep arriving.
+            The bounded queue keeps at most TTS_PIPELINE_DEPTH segments ahead.
+            """
+            nonlocal full_response_text
+            segmenter = SentenceSegmenter()
+            speech_buffer = "" # Accumulate sentences for smoother speech
             accumulated_raw_text = ""
 
             try:
-                for chunk in stream:
-                    if chunk.choices[0].delta.content:
-                        content = chunk.choices[0].delta.content
-                        full_response_text += content
-                        buffer += content
-                        # We still send text_chunk for "fast" display if frontend wants it, 
-                        # but for sync mode we strictly use response_segment
-                        # yield f"data: {json.dumps({'type': 'text_chunk', 'content': content})}\n\n"
-                        
-                        # Check for sentence completion
-                        while True:
-                            match = re.search(r'[.!?]\s', buffer)
-                            if not match:
-                                break
-                                
-                            sentence = buffer[:match.end()]
-                            buffer = buffer[match.end():]
-                            
-                            accumulated_raw_text += sentence
-                            
-                            # Add to speech buffer
-                            cleaned_sentence = clean_text_for_speech(sentence)
-                            if cleaned_sentence:
-                                speech_buffer += " " + cleaned_sentence
-                            
-                            # Only generate audio if buffer is long enough (e.g. > 50 chars) to reduce requests/choppiness
-                            if len(speech_buffer) > 50:
-                                # USE AZURE TTS
-                                from .azure_services import generate_speech as generate_speech_azure
-                                audio_content = generate_speech_azure(speech_buffer.strip(), voice_name=voice_name)
-                                
-                                audio_base64 = None
-                                if audio_content:
-                                    audio_base64 = base64.b64encode(audio_content).decode('utf-8')
-                                else:
-                                    print("⚠ Audio generation failed")
-                                
-                                # Send synchronized segment
-                                yield f"data: {json.dumps({'type': 'response_segment', 'text': accumulated_raw_text, 'audio': audio_base64})}\n\n"
-                                
-                                # Reset buffers
-                                speech_buffer = ""
-                                accumulated_raw_text = ""
+                try:
+                    async for chunk in stream:
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            content = chunk.choices[0].delta.content
+                            full_response_text += content
+
+                            # Sentences completed by this delta
+                            for sentence in segmenter.feed(content):
+                                accumulated_raw_text += sentence
 
+                                # Add to speech buffer
+                                cleaned_sentence = clean_text_for_speech(sentence)
+                                if cleaned_sentence:
+                                    speech_buffer += " " + cleaned_sentence
+
+                                # Only generate audio if buffer is long enough (e.g. > 50 chars) to reduce requests/choppiness
+                                if len(speech_buffer) > 50:
+                                    await segments.put(asyncio.ensure_future(
+                                        segment_event(accumulated_raw_text, speech_buffer.strip(), voice_name, binary_audio)
+                                    ))
+
+                                    # Reset buffers
+                                    speech_buffer = ""
+                                    accumulated_raw_text = ""
+
+                except Exception as e:
+                    print(f"Stream error: {e}")
+                    await segments.put(f"data: {json.dumps({'type': 'error', 'content': str(e)})}\n\n")
+
+                # Process remaining text (incomplete sentence or end of stream)
+                sentence = segmenter.flush()
+                if sentence.strip():
+                     accumulated_raw_text += sentence
+                     cleaned_buffer = clean_text_for_speech(sentence)
+                     if cleaned_buffer:
+                         speech_buffer += " " + cleaned_buffer
+
+                # Process remaining speech buffer / raw text (text only if there is no speech content)
+                if accumulated_raw_text.strip():
+                    await segments.put(asyncio.ensure_future(
+                        segment_event(accumulated_raw_text, speech_buffer.strip(), voice_name, binary_audio)
+                    ))
             except Exception as e:
-                print(f"Stream error: {e}")
-                yield f"data: {json.dumps({'type': 'error', 'content': str(e)})}\n\n"
-            
-            # Process remaining text buffer (incomplete sentence or end of stream)
-            if buffer.strip():
-                 sentence = buffer
-                 accumulated_raw_text += sentence
-                 cleaned_buffer = clean_text_for_speech(sentence)
-                 if cleaned_buffer:
-                     speech_buffer += " " + cleaned_buffer
-
-            # Process remaining speech buffer / raw text
-            if accumulated_raw_text.strip():
-                if speech_buffer.strip():
-                    # USE AZURE TTS
-                    from .azure_services import generate_speech as generate_speech_azure
-                    audio_content = generate_speech_azure(speech_buffer.strip(), voice_name=voice_name)
-                    
-                    audio_base64 = None
-                    if audio_content:
-                        audio_base64 = base64.b64encode(audio_content).decode('utf-8')
-                    else:
-                         print("⚠ Final audio generation failed")
-                    
-                    yield f"data: {json.dumps({'type': 'response_segment', 'text': accumulated_raw_text, 'audio': audio_base64})}\n\n"
+                print(f"Segment error: {e}")
+                await segments.put(f"data: {json.dumps({'type': 'error', 'content': str(e)})}\n\n")
+            finally:
+                # The consumer reads until None: send it whatever failed above
+                await segments.put(None)
+
+        async def llm_segments(stream):
+            # Segments are queued in text order; awaiting them in that order
+            # keeps the `response_segment` events in order
+            segments = asyncio.Queue(maxsize=TTS_PIPELINE_DEPTH)
+            producer = asyncio.ensure_future(produce_segments(stream, segments))
+            try:
+                while (item := await segments.get()) is not None:
+                    yield item if isinstance(item, str) else await item
+            finally:
+                producer.cancel()
+                while not segments.empty():
+                    cancel_pending([segments.get_nowait()])
+
+        async def event_stream():
+            # Every task of the turn starts here, on the loop that consumes the
+            # response: under WSGI that isn't the loop post() ran on
+            assessment_task = None
+            if assess_pronunciation:
+                assessment_task = asyncio.ensure_future(
+                    pronunciation_assessment_async(audio_file, user_message, language=detected_lang)
+                )
+
+            try:
+                # Send session ID to frontend so it can update URL/state
+                if chat_session:
+                     yield f"data: {json.dumps({'type': 'session_id', 'id': chat_session.id})}\n\n"
+
+                if is_audio:
+                    yield f"data: {json.dumps({'type': 'transcription', 'text': user_message})}\n\n"
+
+                if starter_data:
+                    reply_segments = starter_segments()
                 else:
-                    # Text only (no speech content)
-                    yield f"data: {json.dumps({'type': 'response_segment', 'text': accumulated_raw_text, 'audio': None})}\n\n"
-            
-            # --- Persistence: Save Assistant Message ---
-            if chat_session and full_response_text:
-                ChatMessage.objects.create(session=chat_session, role='assistant', content=full_response_text)
-            # -------------------------------------------
+                    # 2. Get Response from LLM (Streaming)
+                    stream = await get_chat_response_async(messages)
+                    if stream is None:
+                        error = "Failed to get response from AI service. Check API Key."
+                        yield f"data: {json.dumps({'type': 'error', 'content': error})}\n\n"
+                        return
+                    reply_segments = llm_segments(stream)
+
+                async for event in interleave_assessment(reply_segments, assessment_task):
+                    yield event
+            finally:
+                # No reply, or client gone mid-reply: the assessment result would never be used
+                cancel_pending([assessment_task])
+
+            # --- Persistence: Assistant message, fluency score + feedback for the next turn ---
+            pronunciation_data = None
+            if assessment_task and assessment_task.done() and assessment_task.result():
+                print(f"✓ Pronunciation assessment completed")
+                pronunciation_data = assessment_task.result()
+            elif assessment_task:
+                print("⚠ Pronunciation assessment not available (Azure not configured or failed)")
+
+            await sync_to_async(finish_turn)(request.user, chat_session, full_response_text, pronunciation_data)
+            # ----------------------------------------------------------------------------------
+
+            # Older turns fell out of the context window: fold them into the summary
+            if chat_session and summarize_before_id:
+                schedule_summary_refresh(chat_session, summarize_before_id)
 
             yield "data: [DONE]\n\n"
 
-        return StreamingHttpResponse(event_stream(), content_type='text/event-stream')
\ No newline at end of file
+        return StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+
+
+class SpeechAudioView(View):
+    """
+    Raw MP3 for a segment sent with `audio_transport=binary`. Ids are content
+    hashes of (text, voice, format): the audio never changes for an id, so it
+    is cacheable forever, and knowing an id already means knowing its text.
+    """
+
+    async def get(self, request, audio_id, *args, **kwargs):
+        audio_content = get_starter_audio_by_key(audio_id) or await get_cached_audio_async(audio_id)
+        if not audio_content:
+            raise Http404("Audio not found")
+
+        response = HttpResponse(audio_content, content_type='audio/mpeg')
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+        response['ETag'] = f'"{audio_id}"'
+        return response
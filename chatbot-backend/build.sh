@@ -3,4 +3,7 @@ set -o errexit
 pip install -r requirements.txt
 
 python manage.py collectstatic --no-input
-python manage.py migrate
\ No newline at end of file
+python manage.py migrate
+python manage.py reconcile_activity_counters
+python manage.py unlock_achievements
+python manage.py build_starter_audio
\ No newline at end of file
@@ -5,6 +5,14 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+The chat endpoint (api.views_openai.ChatView) is async and streams SSE; serve
+it with an ASGI server so streams don't hold a worker each:
+
+    uvicorn core.asgi:application --host 0.0.0.0 --port $PORT
+
+(`manage.py runserver` is WSGI: the chat works, but each reply is buffered and
+sent whole once it has finished.)
 """
 
 import os
@@ -14,3 +22,14 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_asgi_application()
+
+# Open Azure TTS connections for the persona voices, load the starter audio
+# bundle and the token counter's encoding before the first request
+from api.azure_services import prewarm_synthesizers  # noqa: E402
+from api.context_builder import load_encoding  # noqa: E402
+from api.personas import persona_voices  # noqa: E402
+from api.starter_audio import load_starter_bundle  # noqa: E402
+
+prewarm_synthesizers(persona_voices())
+load_starter_bundle()
+load_encoding()
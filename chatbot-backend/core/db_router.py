@@ -0,0 +1,87 @@
+"""
+Read-replica routing. Views opt in with ReplicaReadMixin: their safe (GET/HEAD)
+requests read from the `replica` alias, unless the user wrote something in
+the last REPLICA_STICKY_SECONDS (read-your-writes) or the request itself
+writes. Everything else, and anything inside a transaction, uses `default`.
+
+Without REPLICA_DATABASE_URL there's no `replica` alias and nothing changes.
+"""
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+REPLICA_ALIAS = 'replica'
+
+
+class ReadRouting:
+    def __init__(self, alias):
+        self.alias = alias
+
+
+# Set per request by ReplicaReadMixin
+_read_routing = ContextVar('read_routing', default=None)
+
+
+def sticky_key(user_id):
+    return f"db_sticky:{user_id}"
+
+
+def mark_recent_write(user_id):
+    """The user's reads go to the primary for the next REPLICA_STICKY_SECONDS."""
+    if REPLICA_ALIAS in settings.DATABASES:
+        cache.set(sticky_key(user_id), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def is_sticky(user_id):
+    return cache.get(sticky_key(user_id)) is not None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _read_routing.get()
+        if routing is None or routing.alias is None:
+            return DEFAULT_DB_ALIAS
+        # Reads inside a transaction (select_for_update, read-modify-write) stay on the primary
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return routing.alias
+
+    def db_for_write(self, model, **hints):
+        # After a write, the rest of the request reads what it wrote
+        routing = _read_routing.get()
+        if routing is not None:
+            routing.alias = None
+        # Explicit: otherwise Django would save an instance back to the alias it was read from
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Same data on both aliases
+        return True
+
+
+class ReplicaReadMixin:
+    """For DRF views: safe requests read from the replica; unsafe ones mark the user sticky."""
+    replica_reads = True
+
+    def initial(self, request, *args, **kwargs):
+        # Authentication runs here, so the user is known afterwards
+        super().initial(request, *args, **kwargs)
+        if (
+            self.replica_reads
+            and request.method in SAFE_METHODS
+            and REPLICA_ALIAS in settings.DATABASES
+            and not (request.user.is_authenticated and is_sticky(request.user.id))
+        ):
+            self._read_routing_token = _read_routing.set(ReadRouting(REPLICA_ALIAS))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_read_routing_token', None)
+        if token is not None:
+            _read_routing.reset(token)
+            self._read_routing_token = None
+        if request.method not in SAFE_METHODS and request.user.is_authenticated:
+            mark_recent_write(request.user.id)
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -50,7 +50,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.AsyncWhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -79,6 +79,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'core.wsgi.application'
+ASGI_APPLICATION = 'core.asgi.application'
 
 
 # Database
@@ -91,6 +92,43 @@ DATABASES = {
     )
 }
 
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # Un escritor espera hasta 20 s el lock de escritura en vez de fallar con
+    # "database is locked" (api/gamification.py lo toma al empezar su transacción)
+    DATABASES['default'].setdefault('OPTIONS', {})['timeout'] = 20
+    # Tests en archivo: la base en memoria compartida no admite escritores concurrentes
+    DATABASES['default']['TEST'] = {'NAME': os.path.join(BASE_DIR, 'test_db.sqlite3')}
+
+# Réplica de lectura opcional (core/db_router.py): los GET de sesiones y mensajes
+# se leen de ella, salvo durante REPLICA_STICKY_SECONDS tras una escritura del usuario.
+# En local: REPLICA_DATABASE_URL=sqlite:///replica.sqlite3 (una copia de db.sqlite3)
+if os.environ.get('REPLICA_DATABASE_URL'):
+    DATABASES['replica'] = dj_database_url.parse(os.environ['REPLICA_DATABASE_URL'], conn_max_age=600)
+    DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+
+
+# Cache
+# LocMem es por proceso: con varios workers hace falta REDIS_URL (requiere el
+# paquete redis) para que compartan el historial cacheado de cada sesión; si no,
+# cada worker guarda el suyo y el contexto de un turno puede omitir mensajes
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -137,6 +175,34 @@ if not DEBUG:
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache de audio TTS (api/tts_cache.py): LRU en memoria + disco con tope de tamaño
+TTS_CACHE_ENABLED = os.environ.get('TTS_CACHE_ENABLED', '1') != '0'
+TTS_CACHE_DIR = os.environ.get('TTS_CACHE_DIR', os.path.join(BASE_DIR, 'tts_cache'))
+TTS_CACHE_MEMORY_MAX_BYTES = int(os.environ.get('TTS_CACHE_MEMORY_MAX_BYTES', 32 * 1024 * 1024))
+TTS_CACHE_DISK_MAX_BYTES = int(os.environ.get('TTS_CACHE_DISK_MAX_BYTES', 512 * 1024 * 1024))
+
+# Audio pre-renderizado de los starters (manage.py build_starter_audio, en build.sh)
+STARTER_AUDIO_DIR = os.environ.get('STARTER_AUDIO_DIR', os.path.join(BASE_DIR, 'starter_audio'))
+
+# Contexto enviado al LLM (api/context_builder.py): presupuesto de tokens y
+# mensajes leídos de la BD; lo que queda fuera se resume en segundo plano
+CHAT_CONTEXT_MAX_TOKENS = int(os.environ.get('CHAT_CONTEXT_MAX_TOKENS', 3000))
+CHAT_CONTEXT_MAX_MESSAGES = int(os.environ.get('CHAT_CONTEXT_MAX_MESSAGES', 40))
+CHAT_SUMMARY_BATCH_MESSAGES = int(os.environ.get('CHAT_SUMMARY_BATCH_MESSAGES', 60))
+# Historial preparado por sesión en la cache (api/history_cache.py)
+CHAT_HISTORY_CACHE_TTL = int(os.environ.get('CHAT_HISTORY_CACHE_TTL', 60 * 60))
+
+# Respuesta de GET /api/progress/ por usuario (api/progress_cache.py); se invalida al escribir
+PROGRESS_CACHE_TTL = int(os.environ.get('PROGRESS_CACHE_TTL', 60 * 60))
+
+# Sesiones sin actividad por más de estos días se archivan comprimidas
+# (manage.py archive_sessions) y se restauran al abrirlas
+CHAT_ARCHIVE_AFTER_DAYS = int(os.environ.get('CHAT_ARCHIVE_AFTER_DAYS', 180))
+
+# Retención: mensajes y sesiones inactivas más antiguos que esto se borran
+# con manage.py purge_expired_chats (0 = desactivado)
+CHAT_RETENTION_DAYS = int(os.environ.get('CHAT_RETENTION_DAYS', 0))
+
 # Configuración de Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -13,10 +13,14 @@ interface ChatBoxProps {
   sendMessage: (content: string | Blob, isAudio?: boolean) => Promise<void>;
   isLoading: boolean;
   isBotTyping: boolean;
+  hasOlderMessages?: boolean;
+  loadOlderMessages?: () => Promise<boolean>;
 }
 
-export function ChatBox({ setIsTalking, messages, sendMessage, isLoading, isBotTyping }: ChatBoxProps) {
+export function ChatBox({ setIsTalking, messages, sendMessage, isLoading, isBotTyping, hasOlderMessages, loadOlderMessages }: ChatBoxProps) {
   const containerRef = useRef<HTMLDivElement | null>(null);
+  // scrollHeight before an older page is prepended, to keep the view in place
+  const prependHeightRef = useRef<number | null>(null);
 
   const handleSend = (content: string | Blob, isAudio: boolean = false) => {
     sendMessage(content, isAudio);
@@ -30,12 +34,26 @@ export function ChatBox({ setIsTalking, messages, sendMessage, isLoading, isBotT
   useEffect(() => {
     const container = containerRef.current;
     if (!container) return;
+    if (prependHeightRef.current !== null) {
+      container.scrollTop = container.scrollHeight - prependHeightRef.current;
+      prependHeightRef.current = null;
+      return;
+    }
     container.scrollTop = container.scrollHeight;
   }, [messages]);
 
+  const handleScroll = () => {
+    const container = containerRef.current;
+    if (!container || container.scrollTop > 0 || !hasOlderMessages || !loadOlderMessages) return;
+    prependHeightRef.current = container.scrollHeight;
+    loadOlderMessages().then((prepended) => {
+      if (!prepended) prependHeightRef.current = null;
+    });
+  };
+
   return (
     <div className={styles.container}>
-      <div className={styles.messages} ref={containerRef}>
+      <div className={styles.messages} ref={containerRef} onScroll={handleScroll}>
         {messages.length === 0 ? (
           <div className={styles.empty}>
             <p className={styles.emptyTitle}>Comienza una conversación</p>
@@ -17,6 +17,7 @@ interface SidebarProps {
 export default function Sidebar({ sessionId, loadSession, createNewChat, currentPersona, setPersona, isOpen, onClose }: SidebarProps) {
   const router = useRouter();
   const [sessions, setSessions] = useState<any[]>([]);
+  const [nextPage, setNextPage] = useState<string | null>(null);
   const [editingId, setEditingId] = useState<number | null>(null);
   const [editTitle, setEditTitle] = useState("");
   const [isSettingsOpen, setIsSettingsOpen] = useState(false);
@@ -31,20 +32,22 @@ export default function Sidebar({ sessionId, loadSession, createNewChat, current
     fetchSessions();
   }, [sessionId]);
 
-  const fetchSessions = async () => {
+  // The list is paginated (cursor): `url` is the `next` link when loading more
+  const fetchSessions = async (url?: string) => {
     try {
       const token = localStorage.getItem("accessToken");
       if (!token) return;
 
       const apiUrl = process.env.NEXT_PUBLIC_API_URL;
 
-      const res = await fetch(`${apiUrl}/api/sessions/`, {
+      const res = await fetch(url || `${apiUrl}/api/sessions/`, {
         headers: { Authorization: `Bearer ${token}` }
       });
 
       if (res.ok) {
         const data = await res.json();
-        setSessions(data);
+        setSessions(prev => url ? [...prev, ...data.results] : data.results);
+        setNextPage(data.next);
       }
     } catch (e) {
       console.error("Error fetching sessions:", e);
@@ -163,6 +166,11 @@ export default function Sidebar({ sessionId, loadSession, createNewChat, current
                   )}
                 </li>
               ))}
+              {nextPage && (
+                <li className={styles.loadMore} onClick={() => fetchSessions(nextPage)}>
+                  Cargar más
+                </li>
+              )}
             </ul>
           </div>
         </div>
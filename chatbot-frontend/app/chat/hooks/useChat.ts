@@ -1,5 +1,5 @@
 "use client";
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 
 export type Message = {
   id: string | number;
@@ -21,18 +21,35 @@ export type PronunciationData = {
   }>;
 };
 
+type Playback = { audio: HTMLAudioElement, audioCtx: AudioContext | null };
+
+// Stops a segment's audio and frees its buffer and AudioContext (browsers cap open contexts)
+const releasePlayback = (playback: Playback | null) => {
+  if (!playback) return;
+  playback.audio.onended = null;
+  playback.audio.onerror = null;
+  playback.audio.pause();
+  playback.audio.removeAttribute("src");
+  playback.audio.load();
+  playback.audioCtx?.close();
+};
+
 export function useChat() {
   const [messages, setMessages] = useState<Message[]>([]);
   const [isBotTyping, setIsBotTyping] = useState(false);
   const [isLoading, setIsLoading] = useState(false);
 
   // Audio & Sync State
-  // Queue stores segments: { text: string (to display), audio: string (base64) | null }
+  // Queue stores segments: { text: string (to display), audio: string (playable src: tts URL or base64 data URI) | null }
   const [segmentQueue, setSegmentQueue] = useState<Array<{ text: string, audio: string | null }>>([]);
   const [isProcessingQueue, setIsProcessingQueue] = useState(false);
   const [currentAnalyser, setCurrentAnalyser] = useState<AnalyserNode | null>(null);
+  // The segment playing, released when it ends or the hook unmounts
+  const playbackRef = useRef<Playback | null>(null);
 
   const [sessionId, setSessionId] = useState<number | null>(null);
+  // Link to the previous (older) page of the loaded session's history
+  const [olderMessagesUrl, setOlderMessagesUrl] = useState<string | null>(null);
 
   // New state for pronunciation assessment
   const [pronunciationData, setPronunciationData] = useState<PronunciationData | null>(null);
@@ -45,6 +62,11 @@ export function useChat() {
     if (saved) setCurrentPersona(saved);
   }, []);
 
+  useEffect(() => () => {
+    releasePlayback(playbackRef.current);
+    playbackRef.current = null;
+  }, []);
+
   // Process the segment queue
   useEffect(() => {
     const processQueue = async () => {
@@ -57,14 +79,18 @@ export function useChat() {
       // If the last message is NOT from assistant, we need to add one? 
       // Actually, we add the placeholder when request starts.
 
-      const playAudio = (base64: string): Promise<void> => {
+      const playAudio = (src: string): Promise<void> => {
         return new Promise((resolve) => {
-          const audio = new Audio(`data:audio/mp3;base64,${base64}`);
+          const audio = new Audio();
+          // Needed so the analyser can read cross-origin audio from /api/tts/
+          audio.crossOrigin = "anonymous";
+          audio.src = src;
 
           // Audio Context for Lip Sync
           const AudioContext = window.AudioContext || (window as any).webkitAudioContext;
+          let audioCtx: AudioContext | null = null;
           if (AudioContext) {
-            const audioCtx = new AudioContext();
+            audioCtx = new AudioContext();
             const source = audioCtx.createMediaElementSource(audio);
             const analyser = audioCtx.createAnalyser();
             analyser.fftSize = 256;
@@ -78,18 +104,27 @@ export function useChat() {
             }
           }
 
-          audio.onended = () => {
+          const playback = { audio, audioCtx };
+          playbackRef.current = playback;
+          let finished = false;
+          const finish = () => {
+            // play() also rejects once the element is released
+            if (finished) return;
+            finished = true;
+            releasePlayback(playback);
+            if (playbackRef.current === playback) playbackRef.current = null;
             setCurrentAnalyser(null);
             resolve();
           };
+
+          audio.onended = finish;
           audio.onerror = () => {
             console.error("Audio playback error");
-            setCurrentAnalyser(null);
-            resolve();
+            finish();
           };
           audio.play().catch(e => {
             console.error("Play failed", e);
-            resolve();
+            finish();
           });
         });
       };
@@ -164,35 +199,65 @@ export function useChat() {
     window.speechSynthesis.cancel(); // Safety
   };
 
+  // Map backend messages to frontend format
+  const mapHistory = (results: { id: number; role: string; content: string }[]): Message[] =>
+    results.map((msg) => ({
+      id: msg.id,
+      role: msg.role,
+      content: msg.content,
+      isAudio: false // History is text-only for now
+    }));
+
   const loadSession = async (id: number) => {
     setSessionId(id);
     setMessages([]); // Clear current messages
+    setOlderMessagesUrl(null);
     setPronunciationData(null); // Clear pronunciation data
     try {
       const token = localStorage.getItem("accessToken");
+      // Latest page first; older pages are loaded when scrolling up
       const res = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/sessions/${id}/messages/`, {
         headers: { Authorization: `Bearer ${token}` }
       });
       if (res.ok) {
         const data = await res.json();
-        // Map backend messages to frontend format
-        const mappedMessages = data.map((msg: { id: number; role: string; content: string }) => ({
-          id: msg.id,
-          role: msg.role,
-          content: msg.content,
-          isAudio: false // History is text-only for now
-        }));
-        setMessages(mappedMessages);
+        setMessages(mapHistory(data.results));
+        setOlderMessagesUrl(data.previous);
       }
     } catch (e) {
       console.error("Error loading session:", e);
     }
   };
 
+  // Resolves to true if a page was prepended
+  const loadOlderMessages = async (): Promise<boolean> => {
+    if (!olderMessagesUrl) return false;
+    const url = olderMessagesUrl;
+    setOlderMessagesUrl(null); // Avoid duplicate loads while this one is in flight
+    try {
+      const token = localStorage.getItem("accessToken");
+      const res = await fetch(url, {
+        headers: { Authorization: `Bearer ${token}` }
+      });
+      if (res.ok) {
+        const data = await res.json();
+        setMessages((prev) => [...mapHistory(data.results), ...prev]);
+        setOlderMessagesUrl(data.previous);
+        return data.results.length > 0;
+      }
+      setOlderMessagesUrl(url);
+    } catch (e) {
+      console.error("Error loading older messages:", e);
+      setOlderMessagesUrl(url);
+    }
+    return false;
+  };
+
   const createNewChat = () => {
     console.log("createNewChat called");
     setSessionId(null);
     setMessages([]);
+    setOlderMessagesUrl(null);
     setSegmentQueue([]);
     setIsProcessingQueue(false);
     setCurrentAnalyser(null);
@@ -238,6 +303,9 @@ export function useChat() {
       // Append Persona
       formData.append("persona", currentPersona);
 
+      // Segment audio as raw MP3 from /api/tts/<id>/ instead of base64 in the SSE events
+      formData.append("audio_transport", "binary");
+
       const token = localStorage.getItem("accessToken");
       const headers: HeadersInit = {};
       if (token) {
@@ -319,7 +387,10 @@ export function useChat() {
                 // botContent += data.content; 
               } else if (data.type === "response_segment") {
                 // Push synchronized segment to queue
-                setSegmentQueue(prev => [...prev, { text: data.text, audio: data.audio }]);
+                const audioSrc = data.audio_id
+                  ? `${process.env.NEXT_PUBLIC_API_URL}/api/tts/${data.audio_id}/`
+                  : data.audio ? `data:audio/mp3;base64,${data.audio}` : null;
+                setSegmentQueue(prev => [...prev, { text: data.text, audio: audioSrc }]);
               } else if (data.type === "error") {
                 console.warn("Backend error:", data.content);
               }
@@ -348,6 +419,8 @@ export function useChat() {
     currentAnalyser,
     sessionId,
     loadSession,
+    loadOlderMessages,
+    hasOlderMessages: !!olderMessagesUrl,
     createNewChat,
     pronunciationData,
     currentPersona,
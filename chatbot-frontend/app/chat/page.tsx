@@ -135,6 +135,8 @@ export default function Page() {
           sendMessage={chat.sendMessage}
           isLoading={chat.isLoading}
           isBotTyping={chat.isLoading}
+          hasOlderMessages={chat.hasOlderMessages}
+          loadOlderMessages={chat.loadOlderMessages}
         />
 
         {/* Floating Controls (Theme & Customizer) */}